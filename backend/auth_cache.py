@@ -0,0 +1,192 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import requests
+from google.auth import jwt
+
+logger = logging.getLogger(__name__)
+
+# --- Token Verification Settings ---
+FIREBASE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+FIREBASE_ISSUER_PREFIX = "https://securetoken.google.com/"
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "4096"))
+TOKEN_CACHE_SKEW_SECONDS = int(os.getenv("TOKEN_CACHE_SKEW_SECONDS", "30"))
+CERTS_REFRESH_MARGIN_SECONDS = int(os.getenv("CERTS_REFRESH_MARGIN_SECONDS", "300"))
+CERTS_RETRY_SECONDS = int(os.getenv("CERTS_RETRY_SECONDS", "30"))
+CERTS_MIN_REFETCH_SECONDS = 60
+
+
+class KeySource:
+    """Holds Google's Firebase signing certificates and refreshes them in a background thread before they expire."""
+
+    def __init__(self, url=FIREBASE_CERTS_URL, refresh_margin=CERTS_REFRESH_MARGIN_SECONDS, retry_seconds=CERTS_RETRY_SECONDS):
+        self.url = url
+        self.refresh_margin = refresh_margin
+        self.retry_seconds = retry_seconds
+        self.certs = {}
+        self.expires_at = 0.0
+        self.fetched_at = 0.0
+        self.fetches = 0
+        self.fetch_errors = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def fetch(self):
+        """Returns (certs, max_age_seconds) from the certificate endpoint."""
+        response = requests.get(self.url, timeout=10)
+        response.raise_for_status()
+        match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        return response.json(), int(match.group(1)) if match else 3600
+
+    def refresh(self, min_interval=0):
+        with self._lock:
+            if self.certs and time.time() - self.fetched_at < min_interval:
+                return self.certs
+        certs, max_age = self.fetch()
+        with self._lock:
+            self.certs = certs
+            self.fetched_at = time.time()
+            self.expires_at = self.fetched_at + max_age
+            self.fetches += 1
+        return certs
+
+    def get_certs(self):
+        with self._lock:
+            if self.certs and time.time() < self.expires_at:
+                return self.certs
+        return self.refresh()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="firebase-certs", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                wait = max(self.expires_at - time.time() - self.refresh_margin, self.retry_seconds)
+            except Exception as e:
+                self.fetch_errors += 1
+                logger.warning("Failed to prefetch Firebase signing certificates: %s", e)
+                wait = self.retry_seconds
+            self._stop.wait(wait)
+
+
+class StaticKeySource:
+    """A fixed certificate set, for locally minted tokens in benchmarks."""
+
+    def __init__(self, certs):
+        self.certs = certs
+
+    def get_certs(self):
+        return self.certs
+
+    def refresh(self, min_interval=0):
+        return self.certs
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class TokenVerifier:
+    """Verifies Firebase ID tokens like auth.verify_id_token and caches the claims until the token expires."""
+
+    def __init__(self, project_id, key_source, max_entries=TOKEN_CACHE_MAX_ENTRIES, skew=TOKEN_CACHE_SKEW_SECONDS):
+        self.project_id = project_id
+        self.key_source = key_source
+        self.max_entries = max_entries
+        self.skew = skew
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.evictions = 0
+        self.verify_count = 0
+        self.verify_seconds_total = 0.0
+        self.verify_seconds_max = 0.0
+
+    def verify(self, token):
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, valid_until = entry
+                if now < valid_until:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(claims)
+                del self._entries[key]
+            self.misses += 1
+
+        started = time.perf_counter()
+        try:
+            claims = self._verify_signature(token)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.verify_count += 1
+                self.verify_seconds_total += elapsed
+                self.verify_seconds_max = max(self.verify_seconds_max, elapsed)
+
+        with self._lock:
+            self._entries[key] = (claims, claims["exp"] - self.skew)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return dict(claims)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "failures": self.failures,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "verifyCount": self.verify_count,
+                "verifySecondsTotal": self.verify_seconds_total,
+                "verifySecondsMax": self.verify_seconds_max,
+            }
+
+    def _verify_signature(self, token):
+        header = jwt.decode_header(token)
+        if not header.get("kid"):
+            raise ValueError('Firebase ID token has no "kid" claim.')
+        if header.get("alg") != "RS256":
+            raise ValueError(f'Firebase ID token has incorrect algorithm. Expected "RS256" but got "{header.get("alg")}".')
+        certs = self.key_source.get_certs()
+        if header["kid"] not in certs:
+            # Google may have rotated its keys since the last prefetch; refetch at most once a minute.
+            certs = self.key_source.refresh(min_interval=CERTS_MIN_REFETCH_SECONDS)
+        claims = jwt.decode(token, certs=certs, audience=self.project_id)
+        expected_issuer = FIREBASE_ISSUER_PREFIX + self.project_id
+        if claims.get("iss") != expected_issuer:
+            raise ValueError(f'Firebase ID token has incorrect "iss" (issuer) claim. Expected "{expected_issuer}" but got "{claims.get("iss")}".')
+        subject = claims.get("sub")
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            raise ValueError('Firebase ID token has an invalid "sub" (subject) claim.')
+        claims["uid"] = subject
+        return claims
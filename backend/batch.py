@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import random
+import shutil
+import socket
+import asyncio
+import sqlite3
+import secrets
+import zipfile
+import tempfile
+import threading
+
+from llm import LLMQueueFull
+from metrics import batch_retries, stage
+
+# --- Batch Screening Settings ---
+BATCH_DB = os.getenv("BATCH_DB", "batch.db")
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))
+BATCH_MAX_FILE_BYTES = int(os.getenv("BATCH_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+# Whole multipart body, zip archives included; enforced by UploadLimitMiddleware before the body is spooled.
+BATCH_MAX_REQUEST_BYTES = int(os.getenv("BATCH_MAX_REQUEST_BYTES", str(256 * 1024 * 1024)))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+BATCH_REQUESTS_PER_MINUTE = float(os.getenv("BATCH_REQUESTS_PER_MINUTE", "60"))
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "4"))
+BATCH_RETRY_BASE_SECONDS = float(os.getenv("BATCH_RETRY_BASE_SECONDS", "1"))
+BATCH_RETRY_MAX_SECONDS = float(os.getenv("BATCH_RETRY_MAX_SECONDS", "30"))
+BATCH_SPOOL_DIR = os.getenv("BATCH_SPOOL_DIR") or None
+SPOOL_CHUNK_BYTES = 256 * 1024
+
+
+class BatchInputError(ValueError):
+    pass
+
+
+def spool_file(source, spool_dir, filename, max_bytes):
+    """Copies a file object into spool_dir in chunks, failing as soon as it exceeds max_bytes."""
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=spool_dir)
+    with os.fdopen(fd, "wb") as spool:
+        size = 0
+        while chunk := source.read(SPOOL_CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                raise BatchInputError(f"'{filename}' exceeds {max_bytes} bytes.")
+            spool.write(chunk)
+    return path
+
+
+def expand_uploads(uploads, spool_dir, max_files=BATCH_MAX_FILES, max_file_bytes=BATCH_MAX_FILE_BYTES):
+    """Spools a list of (filename, file object) uploads into spool_dir as PDFs, unpacking any zip archives.
+
+    Returns [(filename, path)]. Blocking; call it in a thread. The caller removes spool_dir.
+    """
+    resumes = []
+    for filename, source in uploads:
+        if filename.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(source)
+            except zipfile.BadZipFile as e:
+                raise BatchInputError(f"'{filename}' is not a valid zip archive: {e}")
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(".pdf") or "__MACOSX" in info.filename:
+                    continue
+                if len(resumes) >= max_files:
+                    raise BatchInputError(f"A batch may contain at most {max_files} resumes.")
+                # file_size comes from the archive and may lie, so spool_file enforces the limit as well.
+                if info.file_size > max_file_bytes:
+                    raise BatchInputError(f"'{info.filename}' in '{filename}' exceeds {max_file_bytes} bytes.")
+                with archive.open(info) as member:
+                    resumes.append((os.path.basename(info.filename), spool_file(member, spool_dir, info.filename, max_file_bytes)))
+        elif filename.lower().endswith(".pdf"):
+            if len(resumes) >= max_files:
+                raise BatchInputError(f"A batch may contain at most {max_files} resumes.")
+            resumes.append((filename, spool_file(source, spool_dir, filename, max_file_bytes)))
+        else:
+            raise BatchInputError(f"'{filename}' is not a PDF or zip archive.")
+    if not resumes:
+        raise BatchInputError("No PDF resumes found in the upload.")
+    return resumes
+
+
+def _process_alive(pid):
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows; assume it is alive.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class BatchJobStore:
+    """SQLite-backed job and per-candidate state, so batches need no outside services."""
+
+    def __init__(self, path=BATCH_DB):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, uid TEXT NOT NULL, job_description TEXT NOT NULL, difficulty INTEGER NOT NULL,"
+            " status TEXT NOT NULL, total INTEGER NOT NULL, created_at REAL NOT NULL, finished_at REAL, owner TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS candidates ("
+            " job_id TEXT NOT NULL, idx INTEGER NOT NULL, filename TEXT NOT NULL, status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, score REAL, result TEXT, error TEXT, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (job_id, idx));"
+        )
+        self._lock = threading.Lock()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._sweep_orphans()
+
+    def _sweep_orphans(self):
+        # Spooled uploads belong to the process running the job, so work interrupted by its death cannot resume.
+        # Several uvicorn workers share batch.db, so only jobs whose owning process on this host is gone are failed.
+        host = socket.gethostname()
+        with self._lock:
+            running = self._conn.execute("SELECT job_id, owner FROM jobs WHERE status = 'running'").fetchall()
+            orphans = []
+            for job_id, owner in running:
+                owner_host, _, owner_pid = owner.rpartition(":")
+                if owner_host == host and (int(owner_pid) == os.getpid() or not _process_alive(int(owner_pid))):
+                    orphans.append(job_id)
+            if not orphans:
+                return
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE candidates SET status = 'failed', error = 'Interrupted by a server restart.', updated_at = ? "
+                "WHERE job_id = ? AND status IN ('queued', 'running')", [(now, job_id) for job_id in orphans]
+            )
+            self._conn.executemany("UPDATE jobs SET status = 'failed', finished_at = ? WHERE job_id = ?", [(now, job_id) for job_id in orphans])
+            self._conn.commit()
+
+    def create_job(self, uid, job_description, difficulty, filenames):
+        job_id = secrets.token_urlsafe(12)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, uid, job_description, difficulty, status, total, created_at, owner) VALUES (?, ?, ?, ?, 'running', ?, ?, ?)",
+                (job_id, uid, job_description, difficulty, len(filenames), now, self.owner),
+            )
+            self._conn.executemany(
+                "INSERT INTO candidates (job_id, idx, filename, status, updated_at) VALUES (?, ?, ?, 'queued', ?)",
+                [(job_id, idx, filename, now) for idx, filename in enumerate(filenames)],
+            )
+            self._conn.commit()
+        return job_id
+
+    def update_candidate(self, job_id, idx, status, attempts=None, result=None, error=None):
+        score = None
+        if result is not None:
+            score = (result.get("confidenceScore") or {}).get("score")
+            score = score if isinstance(score, (int, float)) else None
+        with self._lock:
+            self._conn.execute(
+                "UPDATE candidates SET status = ?, attempts = COALESCE(?, attempts), score = COALESCE(?, score),"
+                " result = COALESCE(?, result), error = ?, updated_at = ? WHERE job_id = ? AND idx = ?",
+                (status, attempts, score, json.dumps(result) if result is not None else None, error, time.time(), job_id, idx),
+            )
+            self._conn.commit()
+
+    def finish_job(self, job_id):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'completed', finished_at = ? WHERE job_id = ?", (time.time(), job_id))
+            self._conn.commit()
+
+    def get_job(self, uid, job_id, since=None):
+        """Returns the job with candidates ranked by confidence score, or None if it is not the caller's.
+
+        With `since`, only candidates updated after that timestamp are included.
+        """
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT job_id, status, total, created_at, finished_at FROM jobs WHERE job_id = ? AND uid = ?", (job_id, uid)
+            ).fetchone()
+            if job is None:
+                return None
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM candidates WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+            rows = self._conn.execute(
+                "SELECT idx, filename, status, attempts, score, result, error, updated_at FROM candidates"
+                " WHERE job_id = ? AND updated_at > ? ORDER BY score IS NULL, score DESC, idx",
+                (job_id, since if since is not None else -1),
+            ).fetchall()
+        return {
+            "jobId": job[0],
+            "status": job[1],
+            "total": job[2],
+            "createdAt": job[3],
+            "finishedAt": job[4],
+            "counts": counts,
+            "candidates": [
+                {
+                    "index": idx,
+                    "filename": filename,
+                    "status": status,
+                    "attempts": attempts,
+                    "confidenceScore": score,
+                    "result": json.loads(result) if result else None,
+                    "error": error,
+                    "updatedAt": updated_at,
+                }
+                for idx, filename, status, attempts, score, result, error, updated_at in rows
+            ],
+        }
+
+
+class RateLimiter:
+    """Spaces out calls so no more than `rate_per_minute` start in any minute."""
+
+    def __init__(self, rate_per_minute=BATCH_REQUESTS_PER_MINUTE):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def backoff_delay(attempt, base=BATCH_RETRY_BASE_SECONDS, cap=BATCH_RETRY_MAX_SECONDS):
+    return min(cap, base * 2 ** attempt) + random.uniform(0, base)
+
+
+class BatchRunner:
+    """Fans a batch out over PDF extraction and rate-limited, retried Gemini calls.
+
+    The callables keep this module free of main.py: `extract_text(path)` returns the extracted resume,
+    and `analyze(resume, job_description, difficulty)` turns it into the parsed analysis. Resumes arrive
+    as spooled files in `spool_dir`, which is removed once the job finishes. Store calls run in a thread
+    so SQLite writes stay off the event loop.
+    """
+
+    def __init__(self, store, extract_text, analyze, max_concurrency=BATCH_MAX_CONCURRENCY, rate_limiter=None, max_retries=BATCH_MAX_RETRIES):
+        self.store = store
+        self.extract_text = extract_text
+        self.analyze = analyze
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks = set()
+
+    async def submit(self, uid, job_description, difficulty, resumes, spool_dir):
+        job_id = await asyncio.to_thread(self.store.create_job, uid, job_description, difficulty, [filename for filename, _ in resumes])
+        task = asyncio.create_task(self.run(job_id, job_description, difficulty, resumes, spool_dir))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job_id
+
+    async def run(self, job_id, job_description, difficulty, resumes, spool_dir):
+        try:
+            await asyncio.gather(*(
+                self._run_candidate(job_id, idx, filename, path, job_description, difficulty)
+                for idx, (filename, path) in enumerate(resumes)
+            ))
+            await asyncio.to_thread(self.store.finish_job, job_id)
+        finally:
+            await asyncio.to_thread(shutil.rmtree, spool_dir, ignore_errors=True)
+
+    async def _update(self, *args, **kwargs):
+        await asyncio.to_thread(self.store.update_candidate, *args, **kwargs)
+
+    async def _run_candidate(self, job_id, idx, filename, path, job_description, difficulty):
+        try:
+            resume = await self.extract_text(path)
+        except Exception as e:
+            await self._update(job_id, idx, "failed", error=f"Error reading '{filename}': {e}")
+            return
+        finally:
+            # Retries reuse the extracted text, so the spooled PDF is no longer needed.
+            await asyncio.to_thread(os.unlink, path)
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                with stage("batch_rate_limit"):
+                    await self.rate_limiter.wait()
+                await self._update(job_id, idx, "running", attempts=attempt + 1)
+                try:
+                    result = await self.analyze(resume, job_description, difficulty)
+                    await self._update(job_id, idx, "completed", result=result)
+                    return
+                except Exception as e:
+                    error = e
+            if attempt >= self.max_retries:
+                await self._update(job_id, idx, "failed", error=f"An unexpected error occurred: {error}")
+                return
+            delay = backoff_delay(attempt)
+            if isinstance(error, LLMQueueFull):
+                delay = max(delay, error.retry_after)
+            batch_retries.inc(type(error).__name__)
+            await self._update(job_id, idx, "queued", error=f"Retrying after error: {error}")
+            attempt += 1
+            await asyncio.sleep(delay)
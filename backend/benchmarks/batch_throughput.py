@@ -0,0 +1,82 @@
+"""Throughput benchmark for /batch/analyze-resumes/ against a stub Gemini model.
+
+Run from the backend directory (needs httpx):
+
+    python -m benchmarks.batch_throughput --resumes 100 --latency 1.0 --zip
+
+Reports wall time, resumes/sec and the speed-up over analysing the same
+resumes one request at a time. Set BATCH_MAX_CONCURRENCY and
+BATCH_REQUESTS_PER_MINUTE to explore the scheduler's limits; batch calls also
+share the global LLM_MAX_CONCURRENCY cap with interactive requests.
+"""
+import io
+import os
+import time
+import random
+import asyncio
+import zipfile
+import argparse
+
+import httpx
+
+from benchmarks.fakes import SAMPLE_ANALYSIS, StubModel, make_pdf, load_app
+
+
+def scored_payload(prompt):
+    payload = dict(SAMPLE_ANALYSIS)
+    payload["confidenceScore"] = {"score": random.randint(1, 100), "justification": "Benchmark score."}
+    return payload
+
+
+def build_upload(resumes, as_zip):
+    pdfs = [
+        (f"candidate-{i}.pdf", make_pdf([f"Candidate {i}\nBackend Engineer\nAcme Corp Jan 2019 – Present", "Skills: Python, Go"]))
+        for i in range(resumes)
+    ]
+    if not as_zip:
+        return [("files", (name, data, "application/pdf")) for name, data in pdfs]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in pdfs:
+            archive.writestr(name, data)
+    return [("files", ("resumes.zip", buffer.getvalue(), "application/zip"))]
+
+
+async def run(resumes, latency, as_zip):
+    main = load_app(StubModel(latency=latency, payload=scored_payload))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        response = await client.post(
+            "/batch/analyze-resumes/",
+            files=build_upload(resumes, as_zip),
+            data={"job_description": "Senior Python Developer", "difficulty": "3"},
+        )
+        response.raise_for_status()
+        job_id = response.json()["jobId"]
+        while True:
+            job = (await client.get(f"/batch/{job_id}/")).json()
+            if job["status"] != "running":
+                break
+            await asyncio.sleep(0.05)
+        wall = time.perf_counter() - started
+
+    top = job["candidates"][:3]
+    print(f"resumes={resumes} llm_latency={latency:.2f}s concurrency={main.batch_runner.max_concurrency} status={job['status']} counts={job['counts']}")
+    print(f"wall time: {wall:.2f}s  throughput: {resumes / wall:.2f} resumes/s  speed-up vs serial: {resumes * latency / wall:.1f}x")
+    print("top candidates: " + ", ".join(f"{c['filename']} ({c['confidenceScore']})" for c in top))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--zip", action="store_true", help="upload the resumes as a single zip archive")
+    args = parser.parse_args()
+    os.environ.setdefault("BATCH_DB", ":memory:")
+    os.environ.setdefault("BATCH_REQUESTS_PER_MINUTE", "6000")
+    asyncio.run(run(args.resumes, args.latency, args.zip))
+
+
+if __name__ == "__main__":
+    main()
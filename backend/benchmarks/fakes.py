@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import time
+import asyncio
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+SAMPLE_ANALYSIS = {
+    "candidateName": "Jane Doe",
+    "confidenceScore": {"score": 72, "justification": "Solid backend experience, thin on distributed systems."},
+    "potentialInconsistencies": ["Claims Kubernetes expertise but no project uses it."],
+    "projectNames": ["Payments Platform", "Search Relevance"],
+    "categorizedQuestions": {
+        "Core Technical Skills": [
+            {
+                "question": "How did you size the connection pool for the payments service?",
+                "difficulty": 3,
+                "expectedAnswer": "Measured peak concurrency and database limits, then load tested.",
+                "keywords": ["pool", "load test"],
+                "nonTechnicalExplanation": "For the HR partner: This question tests practical tuning experience.",
+            }
+        ]
+    },
+    "projectQuestions": [
+        {
+            "question": "What was the slowest step in the search pipeline?",
+            "difficulty": 4,
+            "expectedAnswer": "Identified via profiling; fixed by batching index lookups.",
+            "keywords": ["profiling", "batching"],
+            "nonTechnicalExplanation": "For the HR partner: This checks hands-on ownership.",
+        }
+    ],
+}
+# /regenerate-questions/ asks for a list of categories rather than the analysis's map.
+SAMPLE_ANALYSIS["categories"] = [
+    {"category": category, "questions": questions} for category, questions in SAMPLE_ANALYSIS["categorizedQuestions"].items()
+]
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Stands in for genai.GenerativeModel with a fixed latency and payload.
+
+    `payload` may be a callable taking the prompt, for per-call replies.
+    """
+
+    def __init__(self, latency=1.0, payload=None):
+        self.latency = latency
+        self.payload = SAMPLE_ANALYSIS if payload is None else payload
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        payload = self.payload(prompt) if callable(self.payload) else self.payload
+        text = "```json\n" + json.dumps(payload) + "\n```"
+        if stream:
+            return self._stream(text)
+        await asyncio.sleep(self.latency)
+        return StubResponse(text)
+
+    async def _stream(self, text, chunk_size=64):
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield StubResponse(chunk)
+
+
+def make_pdf(pages):
+    """Builds a minimal text-only PDF with one page per string in `pages`."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for page_text in pages:
+        lines = []
+        for line in page_text.splitlines():
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            lines.append(f"({escaped}) Tj T*")
+        stream = "BT /F1 10 Tf 12 TL 50 750 Td " + " ".join(lines) + " ET"
+        objects.append(f"<< /Length {len(stream.encode('cp1252'))} >>\nstream\n{stream}\nendstream")
+        content_ref = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("cp1252")
+    xref_offset = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+class FakeCertificate:
+    project_id = "benchmark-project"
+
+
+class FakeVerifier:
+    """Stands in for auth_cache.TokenVerifier: any bearer token is accepted as the uid it names."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def verify(self, token):
+        if self.latency:
+            time.sleep(self.latency)
+        return {"uid": token, "sub": token}
+
+    def stats(self):
+        return {"hits": 0, "misses": 0, "failures": 0, "evictions": 0, "entries": 0, "verifyCount": 0, "verifySecondsTotal": 0.0, "verifySecondsMax": 0.0}
+
+
+def load_app(model, user=None, verifier=None):
+    """Imports main.app without Firebase credentials or a Gemini key and wires in the stubs.
+
+    With `verifier`, requests go through get_current_user and the verifier instead of a fixed user.
+    """
+    import firebase_admin
+    from firebase_admin import credentials
+
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+    os.environ.setdefault("BATCH_DB", ":memory:")
+    credentials.Certificate = lambda path: FakeCertificate()
+    firebase_admin.initialize_app = lambda *args, **kwargs: None
+
+    import main
+
+    main.get_model = lambda: model
+    main.pdf_ingestor.warm_up()
+    if verifier is not None:
+        main.token_verifier = verifier
+    else:
+        main.app.dependency_overrides[main.get_current_user] = lambda: user or {"uid": "benchmark-user"}
+    return main
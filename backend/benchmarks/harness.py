@@ -0,0 +1,186 @@
+"""Offline latency benchmark for the API endpoints, for catching performance regressions.
+
+Run from the backend directory (needs httpx):
+
+    python -m benchmarks.harness --requests 100 --concurrency 8 --llm-latency 0.05
+    python -m benchmarks.harness --save baseline.json
+    python -m benchmarks.harness --compare baseline.json --tolerance 0.25
+
+Runs the FastAPI app in-process with a stub Gemini model (fixed latency, and
+optionally a JSON payload file) and a fake token verifier, so auth still goes
+through get_current_user. Each endpoint gets --requests calls at
+--concurrency, with a distinct PDF and job description per call so neither
+the PDF nor the result cache short-circuits the work. Prints throughput and
+p50/p95/p99 latency per endpoint, then the mean time per stage from the
+app's own stage_duration_seconds histogram. With --compare, exits non-zero
+if any endpoint's p95 rose or its throughput fell by more than --tolerance.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import httpx
+
+from benchmarks.fakes import FakeVerifier, StubModel, make_pdf, load_app
+from metrics import stage_seconds
+
+AUTH = {"Authorization": "Bearer benchmark-user"}
+PROJECT = "Payments Platform"
+
+
+def resume_pages(tag):
+    return [
+        f"Jane Doe {tag}\nSenior Backend Engineer\nAcme Corp Jan 2019 – Present\nBuilt the {PROJECT} in Python.",
+        "Projects\n" + PROJECT + "\nCut p99 latency by batching ledger writes.\nSkills: Python, Go, PostgreSQL, Kubernetes",
+    ]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+async def analyze(client, i):
+    return await client.post(
+        "/analyze-resume/", headers=AUTH,
+        files={"file": ("resume.pdf", make_pdf(resume_pages(f"A{i}")), "application/pdf")},
+        data={"job_description": f"Senior Python Developer #{i}", "difficulty": "3"},
+    )
+
+
+async def analyze_stream(client, i):
+    # The latency measured is time to the final event, since the body is read in full.
+    return await client.post(
+        "/analyze-resume/stream/", headers=AUTH,
+        files={"file": ("resume.pdf", make_pdf(resume_pages(f"S{i}")), "application/pdf")},
+        data={"job_description": f"Staff Python Developer #{i}", "difficulty": "3"},
+    )
+
+
+def regenerate(resume_id):
+    async def call(client, i):
+        return await client.post("/regenerate-questions/", headers=AUTH, json={
+            "resume_id": resume_id, "job_description": f"Principal Python Developer #{i}", "difficulty": 1 + i % 5, "count": 1 + i % 10,
+        })
+    return call
+
+
+def drilldown(resume_id):
+    async def call(client, i):
+        return await client.post("/project-questions/", headers=AUTH, json={"resume_id": resume_id, "project_name": f"{PROJECT} {i}"})
+    return call
+
+
+async def measure(client, call, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await call(client, i)
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code >= 400 or b"event: error" in response.content
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput": requests / wall,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+async def run(args):
+    payload = None
+    if args.payload:
+        with open(args.payload) as f:
+            payload = json.load(f)
+    main = load_app(StubModel(latency=args.llm_latency, payload=payload), verifier=FakeVerifier(latency=args.auth_latency))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        response = await analyze(client, -1)
+        response.raise_for_status()
+        resume_id = response.json()["resumeId"]
+        endpoints = {
+            "/analyze-resume/": analyze,
+            "/analyze-resume/stream/": analyze_stream,
+            "/regenerate-questions/": regenerate(resume_id),
+            "/project-questions/": drilldown(resume_id),
+        }
+        results = {}
+        for endpoint, call in endpoints.items():
+            if args.endpoints and endpoint not in args.endpoints:
+                continue
+            results[endpoint] = await measure(client, call, args.requests, args.concurrency)
+    return results
+
+
+def print_results(results):
+    print(f"{'endpoint':<26} {'reqs':>5} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, r in results.items():
+        print(f"{endpoint:<26} {r['requests']:>5} {r['errors']:>6} {r['throughput']:>8.1f} "
+              f"{r['p50'] * 1000:>8.1f} {r['p95'] * 1000:>8.1f} {r['p99'] * 1000:>8.1f}")
+
+
+def print_stages(endpoints):
+    print(f"\n{'endpoint':<26} {'stage':<18} {'count':>6} {'mean ms':>8}")
+    for (endpoint, stage), (count, total) in sorted(stage_seconds.snapshot().items()):
+        if endpoint in endpoints:
+            print(f"{endpoint:<26} {stage:<18} {count:>6} {total / count * 1000:>8.2f}")
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for endpoint, r in results.items():
+        before = baseline.get(endpoint)
+        if before is None:
+            continue
+        if r["p95"] > before["p95"] * (1 + tolerance):
+            regressions.append(f"{endpoint}: p95 {before['p95'] * 1000:.1f} -> {r['p95'] * 1000:.1f} ms")
+        if r["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{endpoint}: throughput {before['throughput']:.1f} -> {r['throughput']:.1f} req/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stub Gemini latency in seconds")
+    parser.add_argument("--auth-latency", type=float, default=0.0, help="fake token verification latency in seconds")
+    parser.add_argument("--payload", help="JSON file the stub Gemini model replies with")
+    parser.add_argument("--endpoints", nargs="*", help="only run these endpoints")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file from an earlier --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"llm_latency={args.llm_latency:.3f}s auth_latency={args.auth_latency:.3f}s concurrency={args.concurrency}\n")
+    print_results(results)
+    print_stages(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        print("\nregressions:" if regressions else "\nno regressions against the baseline")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
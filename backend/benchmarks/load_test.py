@@ -0,0 +1,68 @@
+"""Concurrent load test for /analyze-resume/ against a stub Gemini model.
+
+Run from the backend directory (needs httpx):
+
+    python -m benchmarks.load_test --latency 1.0
+    LLM_MAX_QUEUE=4 python -m benchmarks.load_test --requests 20
+
+With the endpoints off the event loop, N concurrent requests should finish in
+roughly one LLM latency as long as N <= LLM_MAX_CONCURRENCY, which is the
+default for --requests. Beyond that, requests queue for a slot, and those over
+LLM_MAX_QUEUE get a 429 with a Retry-After header. Each request uses a
+distinct job description so the result cache does not collapse them.
+"""
+import time
+import asyncio
+import argparse
+
+import httpx
+
+from benchmarks.fakes import StubModel, make_pdf, load_app
+from llm import llm_gate
+
+RESUME_PAGES = [
+    "Jane Doe\nSenior Backend Engineer\nAcme Corp Jan 2019 – Present\nBuilt the Payments Platform in Python.",
+    "Projects\nSearch Relevance: rewrote ranking in Go.\nSkills: Python, Go, PostgreSQL, Kubernetes",
+]
+
+
+async def run(requests, latency):
+    model = StubModel(latency=latency)
+    main = load_app(model)
+    pdf = make_pdf(RESUME_PAGES)
+
+    async def one(client, i):
+        started = time.perf_counter()
+        response = await client.post(
+            "/analyze-resume/",
+            files={"file": ("resume.pdf", pdf, "application/pdf")},
+            data={"job_description": f"Senior Python Developer #{i}", "difficulty": "3"},
+        )
+        return response.status_code, response.headers.get("retry-after"), time.perf_counter() - started
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(client, i) for i in range(requests)))
+        wall = time.perf_counter() - started
+
+    codes = {}
+    for code, _, _ in results:
+        codes[code] = codes.get(code, 0) + 1
+    slowest = max(elapsed for _, _, elapsed in results)
+    retry_after = {value for code, value, _ in results if code == 429}
+    print(f"requests={requests} llm_latency={latency:.2f}s concurrency_cap={llm_gate.max_concurrency} max_queue={llm_gate.max_queue}")
+    print(f"status codes: {codes}" + (f"  429 Retry-After: {sorted(retry_after, key=str)}" if retry_after else ""))
+    print(f"wall time: {wall:.2f}s  slowest request: {slowest:.2f}s  ({wall / latency:.2f}x one LLM latency)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=llm_gate.max_concurrency)
+    parser.add_argument("--latency", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Throughput and memory benchmark for PDF ingestion on a synthetic corpus.
+
+Run from the backend directory:
+
+    python -m benchmarks.pdf_ingestion --documents 40 --pages 12
+
+Builds multi-page text PDFs, then extracts them with the old serial
+`text += page.extract_text()` loop and with PdfIngestor (process pool, cache
+disabled), and finally re-ingests the corpus to show cache hits. Reports
+pages/sec and peak RSS of this process and of the pool workers.
+"""
+import io
+import sys
+import time
+import random
+import asyncio
+import resource
+import argparse
+
+import pypdf
+
+from benchmarks.fakes import make_pdf
+from ingest import PdfIngestor
+
+WORDS = "python go kubernetes latency throughput profiling postgres kafka design review ownership migration".split()
+
+
+def build_corpus(documents, pages, lines_per_page=45, seed=7):
+    rng = random.Random(seed)
+    corpus = []
+    for doc in range(documents):
+        doc_pages = []
+        for page in range(pages):
+            lines = [f"Candidate {doc} - Resume - page {page + 1}"]
+            lines += [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page)]
+            doc_pages.append("\n".join(lines))
+        corpus.append(make_pdf(doc_pages))
+    return corpus
+
+
+def peak_rss_mb(who):
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss / scale
+
+
+def worker_peak_rss_mb():
+    return peak_rss_mb(resource.RUSAGE_SELF)
+
+
+def pool_peak_rss_mb(ingestor):
+    futures = [ingestor.executor.submit(worker_peak_rss_mb) for _ in range(ingestor.workers * 4)]
+    return max(future.result() for future in futures)
+
+
+def serial_baseline(corpus):
+    for data in corpus:
+        text = ""
+        for page in pypdf.PdfReader(io.BytesIO(data)).pages:
+            text += page.extract_text()
+
+
+async def ingest_all(ingestor, corpus):
+    return await asyncio.gather(*(ingestor.ingest_bytes(data) for data in corpus))
+
+
+def report(label, seconds, pages):
+    print(f"{label:>22}: {seconds:6.2f}s  {pages / seconds:8.1f} pages/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.documents, args.pages)
+    total_pages = args.documents * args.pages
+    print(f"corpus: {args.documents} documents x {args.pages} pages, {sum(map(len, corpus)) / 1e6:.1f} MB")
+
+    started = time.perf_counter()
+    serial_baseline(corpus)
+    report("serial baseline", time.perf_counter() - started, total_pages)
+
+    options = {"max_pages": args.pages}
+    if args.workers:
+        options["workers"] = args.workers
+    uncached = PdfIngestor(cache_entries=0, **options)
+    uncached.warm_up()
+    started = time.perf_counter()
+    asyncio.run(ingest_all(uncached, corpus))
+    report(f"pool ({uncached.workers} workers)", time.perf_counter() - started, total_pages)
+    worker_rss = pool_peak_rss_mb(uncached)
+    uncached.shutdown()
+
+    cached = PdfIngestor(**options)
+    cached.warm_up()
+    asyncio.run(ingest_all(cached, corpus))
+    started = time.perf_counter()
+    asyncio.run(ingest_all(cached, corpus))
+    report("cached re-ingest", time.perf_counter() - started, total_pages)
+    cached.shutdown()
+
+    print(f"peak RSS: server process {peak_rss_mb(resource.RUSAGE_SELF):.1f} MB, busiest pool worker {worker_rss:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
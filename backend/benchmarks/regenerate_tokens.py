@@ -0,0 +1,40 @@
+"""Estimates the output tokens a regenerate asks Gemini for.
+
+Run from the backend directory:
+
+    python -m benchmarks.regenerate_tokens
+
+Compares a full-analysis reply, which is what regeneration used to request,
+with the slim question-generation replies. Replay cases for the response
+parser live in tests/test_llm_parsing.py.
+"""
+import json
+
+from benchmarks.fakes import SAMPLE_ANALYSIS
+
+from preprocess import estimate_tokens
+from schemas import ResumeAnalysis
+
+
+def output_tokens():
+    # A typical reply has four categories with three questions each.
+    question = SAMPLE_ANALYSIS["projectQuestions"][0]
+    names = ["Core Technical Skills", "System Design", "Testing and Reliability", "Collaboration"]
+    categories = [{"category": name, "questions": [question] * 3} for name in names]
+    analysis = {key: SAMPLE_ANALYSIS[key] for key in ResumeAnalysis.model_fields}
+    analysis["categorizedQuestions"] = {entry["category"]: entry["questions"] for entry in categories}
+    rows = [
+        ("full analysis (old)", analysis),
+        ("all categories", {"categories": categories}),
+        ("one category", {"categories": categories[:1]}),
+        ("one category, count=1", {"categories": [{"category": names[0], "questions": [question]}]}),
+    ]
+    baseline = estimate_tokens(json.dumps(analysis))
+    print(f"{'regenerate reply':<24} {'est. tokens':>11} {'saved':>7}")
+    for label, reply in rows:
+        tokens = estimate_tokens(json.dumps(reply))
+        print(f"{label:<24} {tokens:>11} {1 - tokens / baseline:>6.0%}")
+
+
+if __name__ == "__main__":
+    output_tokens()
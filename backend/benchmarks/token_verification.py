@@ -0,0 +1,95 @@
+"""Cold vs cached Firebase ID-token verification with locally minted tokens.
+
+Run from the backend directory:
+
+    python -m benchmarks.token_verification --tokens 200 --repeats 20
+
+Signs RS256 tokens with a throwaway key, serves its certificate through a
+StaticKeySource and reports per-verification latency for first sight (full
+signature check) and repeats (cache hits), plus the verifier's counters.
+"""
+import sys
+import time
+import datetime
+import argparse
+import statistics
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from google.auth import crypt, jwt
+
+from benchmarks import fakes  # noqa: F401  (puts the backend directory on sys.path)
+from auth_cache import FIREBASE_ISSUER_PREFIX, StaticKeySource, TokenVerifier
+
+PROJECT_ID = "benchmark-project"
+KEY_ID = "benchmark-key"
+
+
+def make_signer(key_id=KEY_ID):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "benchmark")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number()).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    signer = crypt.RSASigner.from_string(key_pem, key_id=key_id)
+    return signer, {key_id: cert.public_bytes(serialization.Encoding.PEM).decode()}
+
+
+def mint_token(signer, uid, lifetime=3600, **claims):
+    """Returns a Firebase-style ID token; `claims` override the defaults (e.g. aud, iss)."""
+    now = int(time.time())
+    payload = {
+        "iss": FIREBASE_ISSUER_PREFIX + PROJECT_ID,
+        "aud": PROJECT_ID,
+        "sub": uid,
+        "iat": now,
+        "exp": now + lifetime,
+        "auth_time": now,
+        **claims,
+    }
+    return jwt.encode(signer, payload).decode()
+
+
+def timed(verifier, tokens):
+    samples = []
+    for token in tokens:
+        started = time.perf_counter()
+        verifier.verify(token)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    signer, certs = make_signer()
+    verifier = TokenVerifier(PROJECT_ID, StaticKeySource(certs))
+    tokens = [mint_token(signer, f"user-{i}") for i in range(args.tokens)]
+
+    cold = timed(verifier, tokens)
+    warm = timed(verifier, tokens * args.repeats)
+    for label, samples in (("first verification", cold), ("cached", warm)):
+        print(f"{label:>18}: n={len(samples)} mean={statistics.mean(samples):.3f}ms p99={sorted(samples)[int(len(samples) * 0.99) - 1]:.3f}ms")
+
+    rejected = 0
+    for bad in (mint_token(signer, "expired", lifetime=-120), mint_token(signer, "")):
+        try:
+            verifier.verify(bad)
+        except ValueError:
+            rejected += 1
+    print(f"rejected {rejected}/2 invalid tokens")
+    print(f"stats: {verifier.stats()}")
+    sys.exit(0 if rejected == 2 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- Result Cache Settings ---
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", "")
+RESULT_CACHE_DB_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_DB_MAX_ENTRIES", "10000"))
+
+
+def make_cache_key(prompt_version, model_name, prompt):
+    digest = hashlib.sha256()
+    for part in (prompt_version, model_name, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SQLiteResultStore:
+    def __init__(self, path, max_entries=RESULT_CACHE_DB_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key, now):
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0], row[1]
+
+    def set(self, key, value, expires_at, now):
+        # Every entry gets the same TTL, so the earliest to expire is also the oldest written.
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at))
+            self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+            overflow = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY expires_at LIMIT ?)", (overflow,)
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def purge_expired(self, now):
+        with self._lock:
+            self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+
+
+class ResultCache:
+    """In-memory LRU of parsed Gemini results with TTL and size limits, backed by an optional SQLite tier.
+
+    get and set are coroutines: memory hits return inline, and SQLite reads and writes run in a thread.
+    """
+
+    def __init__(self, ttl=RESULT_CACHE_TTL_SECONDS, max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES, db_path=RESULT_CACHE_DB):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk = SQLiteResultStore(db_path) if db_path else None
+        if self.disk:
+            self.disk.purge_expired(time.time())
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(value)
+                self._remove(key)
+                self.expirations += 1
+        if self.disk:
+            row = await asyncio.to_thread(self.disk.get, key, now)
+            if row is not None:
+                value, expires_at = row
+                with self._lock:
+                    self._insert(key, value, expires_at)
+                    self.disk_hits += 1
+                return json.loads(value)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def set(self, key, result):
+        value = json.dumps(result)
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._insert(key, value, expires_at)
+        if self.disk:
+            await asyncio.to_thread(self.disk.set, key, value, expires_at, now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "diskEvictions": self.disk.evictions if self.disk else 0,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _insert(self, key, value, expires_at):
+        if key in self._entries:
+            self._remove(key)
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, expires_at)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+
+result_cache = ResultCache()
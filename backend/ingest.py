@@ -0,0 +1,358 @@
+import os
+import json
+import signal
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pypdf
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# --- PDF Ingestion Settings ---
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "4"))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "30"))
+PDF_PAGE_POLICY = os.getenv("PDF_PAGE_POLICY", "truncate")
+PDF_PAGE_TIMEOUT_SECONDS = float(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", "5"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "128"))
+PDF_SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or None
+PDF_WORKER_MAX_MEMORY_MB = int(os.getenv("PDF_WORKER_MAX_MEMORY_MB", "1024"))
+SPOOL_CHUNK_BYTES = 256 * 1024
+# Room for the other form fields (job description, difficulty) and multipart framing around the PDF.
+UPLOAD_FORM_OVERHEAD_BYTES = 1024 * 1024
+
+IngestResult = namedtuple("IngestResult", "text pages page_count truncated timed_out_pages digest")
+
+
+class IngestError(ValueError):
+    pass
+
+
+class PDFTooLarge(IngestError):
+    pass
+
+
+class PageTimeout(Exception):
+    pass
+
+
+# --- Worker-Side Extraction (runs in the process pool) ---
+def _limit_worker_memory(max_bytes):
+    # A PDF that balloons in memory then raises MemoryError in its task instead of drawing the OOM killer.
+    if max_bytes and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (max_bytes, max_bytes))
+
+
+@contextmanager
+def _page_deadline(seconds):
+    # SIGALRM only exists on Unix and only fires in the main thread, which is where pool workers run tasks.
+    if not seconds or not hasattr(signal, "SIGALRM") or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise PageTimeout()
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _count_pages(path):
+    return len(pypdf.PdfReader(path).pages)
+
+
+def _extract_page_range(path, start, stop, page_timeout):
+    reader = pypdf.PdfReader(path)
+    texts = []
+    timed_out = []
+    for index in range(start, stop):
+        try:
+            with _page_deadline(page_timeout):
+                texts.append(reader.pages[index].extract_text() or "")
+        except PageTimeout:
+            texts.append("")
+            timed_out.append(index)
+    return texts, timed_out
+
+
+def _spool(source, max_bytes):
+    """Copies a file object to a temporary file while hashing it; returns (path, digest)."""
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=PDF_SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            size = 0
+            while chunk := source.read(SPOOL_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise PDFTooLarge(f"PDF exceeds the {max_bytes // (1024 * 1024)} MB upload limit.")
+                digest.update(chunk)
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(SPOOL_CHUNK_BYTES):
+            size += len(chunk)
+            digest.update(chunk)
+    return size, digest.hexdigest()
+
+
+# --- Ingestor ---
+class PdfIngestor:
+    """Spools uploads to disk, extracts pages in parallel on a process pool and caches text by file hash."""
+
+    def __init__(self, workers=PDF_WORKERS, max_bytes=PDF_MAX_BYTES, max_pages=PDF_MAX_PAGES, page_policy=PDF_PAGE_POLICY,
+                 page_timeout=PDF_PAGE_TIMEOUT_SECONDS, pages_per_task=PDF_PAGES_PER_TASK, cache_entries=PDF_CACHE_MAX_ENTRIES,
+                 worker_max_memory_mb=PDF_WORKER_MAX_MEMORY_MB):
+        if page_policy not in ("truncate", "reject"):
+            raise ValueError(f"Unknown PDF_PAGE_POLICY '{page_policy}', expected 'truncate' or 'reject'")
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.page_policy = page_policy
+        self.page_timeout = page_timeout
+        self.pages_per_task = max(1, pages_per_task)
+        self.cache_entries = cache_entries
+        self.worker_max_memory = worker_max_memory_mb * 1024 * 1024
+        self._cache = OrderedDict()
+        self._executor = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.truncated_documents = 0
+        self.timed_out_pages = 0
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            # Forking the server directly is unsafe once it runs threads (uvicorn, cert prefetch); a forkserver
+            # with pypdf preloaded starts workers cheaply, and spawn is the fallback where it is unavailable.
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(["pypdf"])
+            else:
+                context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=context, initializer=_limit_worker_memory, initargs=(self.worker_max_memory,)
+            )
+        return self._executor
+
+    def warm_up(self):
+        # Start every worker up front so the first uploads do not pay for process spawn and imports.
+        for future in [self.executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    async def ingest_upload(self, upload):
+        """Extracts a FastAPI UploadFile, enforcing max_bytes.
+
+        Starlette has already received and spooled the body by now, so this cap only protects extraction;
+        UploadLimitMiddleware is what stops oversized bodies from being received. Pool workers need a path,
+        and Starlette's spool may be in memory or an unnamed file, so the upload is copied (and hashed) once.
+        """
+        if upload.size is not None and upload.size > self.max_bytes:
+            raise PDFTooLarge(f"PDF exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit.")
+        await upload.seek(0)
+        path, digest = await asyncio.to_thread(_spool, upload.file, self.max_bytes)
+        try:
+            cached = self._cache_get(digest)
+            if cached is not None:
+                return cached
+            return await self._ingest_path(path, digest)
+        finally:
+            os.unlink(path)
+
+    async def ingest_bytes(self, data):
+        if len(data) > self.max_bytes:
+            raise PDFTooLarge(f"PDF exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit.")
+        digest = hashlib.sha256(data).hexdigest()
+        cached = self._cache_get(digest)
+        if cached is not None:
+            return cached
+        fd, path = tempfile.mkstemp(suffix=".pdf", dir=PDF_SPOOL_DIR)
+        try:
+            with os.fdopen(fd, "wb") as spool:
+                spool.write(data)
+            return await self._ingest_path(path, digest)
+        finally:
+            os.unlink(path)
+
+    async def ingest_file(self, path):
+        """Extracts a PDF that is already on disk; the caller keeps ownership of the file."""
+        size, digest = await asyncio.to_thread(_hash_file, path)
+        if size > self.max_bytes:
+            raise PDFTooLarge(f"PDF exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit.")
+        cached = self._cache_get(digest)
+        if cached is not None:
+            return cached
+        return await self._ingest_path(path, digest)
+
+    def _discard_executor(self, executor):
+        # A worker that dies (OOM kill, segfault) breaks the whole pool; the next call builds a fresh one.
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "cacheHits": self.cache_hits,
+            "cacheMisses": self.cache_misses,
+            "cacheEntries": len(self._cache),
+            "truncatedDocuments": self.truncated_documents,
+            "timedOutPages": self.timed_out_pages,
+        }
+
+    async def _ingest_path(self, path, digest):
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            page_count = await loop.run_in_executor(executor, _count_pages, path)
+            truncated = page_count > self.max_pages
+            if truncated and self.page_policy == "reject":
+                raise PDFTooLarge(f"PDF has {page_count} pages; at most {self.max_pages} are allowed.")
+            pages_to_read = min(page_count, self.max_pages)
+
+            ranges = [(start, min(start + self.pages_per_task, pages_to_read)) for start in range(0, pages_to_read, self.pages_per_task)]
+            futures = [
+                asyncio.wait_for(
+                    loop.run_in_executor(executor, _extract_page_range, path, start, stop, self.page_timeout),
+                    # Backstop in case the in-worker alarm is unavailable (non-Unix platforms).
+                    timeout=self.page_timeout * (stop - start) + 5 if self.page_timeout else None,
+                )
+                for start, stop in ranges
+            ]
+            chunks = await asyncio.gather(*futures)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise IngestError("A PDF worker crashed while reading the file.")
+        except IngestError:
+            raise
+        except asyncio.TimeoutError:
+            raise IngestError("Timed out extracting text from the PDF.")
+        except MemoryError:
+            raise IngestError("PDF needs too much memory to extract.")
+        except Exception as e:
+            raise IngestError(f"Error reading PDF: {e}")
+
+        pages = []
+        timed_out_pages = []
+        for texts, timed_out in chunks:
+            pages.extend(texts)
+            timed_out_pages.extend(timed_out)
+        # The text is still analysed, but callers report what is missing and it is counted here.
+        if truncated or timed_out_pages:
+            self.truncated_documents += truncated
+            self.timed_out_pages += len(timed_out_pages)
+            logger.warning("PDF %s extracted incompletely: read %d of %d pages, timed out on pages %s",
+                           digest[:12], pages_to_read, page_count, timed_out_pages)
+        result = IngestResult("".join(pages), pages, page_count, truncated, timed_out_pages, digest)
+        self._cache_set(digest, result)
+        return result
+
+    def _cache_get(self, digest):
+        result = self._cache.get(digest)
+        if result is None:
+            self.cache_misses += 1
+            return None
+        self._cache.move_to_end(digest)
+        self.cache_hits += 1
+        return result
+
+    def _cache_set(self, digest, result):
+        self._cache[digest] = result
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+
+pdf_ingestor = PdfIngestor()
+
+
+# --- Upload Size Limit ---
+class RequestTooLarge(Exception):
+    pass
+
+
+class UploadLimitMiddleware:
+    """Answers 413 for request bodies over a per-path byte limit before the multipart parser spools them.
+
+    Content-Length is checked up front; bodies without one (chunked) are counted as they arrive. Form parsing
+    turns errors from receive() into its own 400, so once the limit is hit any response the app starts is
+    replaced with the 413.
+    """
+
+    def __init__(self, app, limits):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await self._reject(send, limit)
+            return
+        received = 0
+        exceeded = started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise RequestTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if exceeded:
+                if message["type"] == "http.response.start" and not started:
+                    started = True
+                    await self._reject(send, limit)
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except RequestTooLarge:
+            if not started:
+                await self._reject(send, limit)
+
+    async def _reject(self, send, limit):
+        body = json.dumps({"detail": f"Request body exceeds the {limit // (1024 * 1024)} MB limit."}).encode()
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
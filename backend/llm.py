@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+from cache import result_cache
+from metrics import current_endpoint, llm_errors, llm_prompt_chars, llm_response_chars, record_stage, stage
+
+# --- LLM Concurrency Settings ---
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_RETRY_AFTER_SECONDS = int(os.getenv("LLM_RETRY_AFTER_SECONDS", "5"))
+LLM_JSON_RETRIES = int(os.getenv("LLM_JSON_RETRIES", "1"))
+
+
+class LLMQueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Too many analyses in progress, please retry shortly.")
+        self.retry_after = retry_after
+
+
+class LLMGate:
+    """Caps in-flight Gemini calls and bounds how many callers may wait for a slot."""
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, max_queue=LLM_MAX_QUEUE, retry_after=LLM_RETRY_AFTER_SECONDS):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            raise LLMQueueFull(self.retry_after)
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+            record_stage("llm_queue", time.perf_counter() - started)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+llm_gate = LLMGate()
+
+
+async def generate_content(model, prompt, gate=None, **kwargs):
+    llm_prompt_chars.observe(len(prompt), current_endpoint())
+    try:
+        async with (gate or llm_gate).slot():
+            with stage("llm_call"):
+                return await model.generate_content_async(prompt, **kwargs)
+    except Exception as e:
+        llm_errors.inc(current_endpoint(), type(e).__name__)
+        raise
+
+
+async def stream_content(model, prompt, gate=None, **kwargs):
+    llm_prompt_chars.observe(len(prompt), current_endpoint())
+    size = chunks = 0
+    try:
+        async with (gate or llm_gate).slot():
+            # llm_call includes time the consumer spends between chunks, e.g. writing SSE events.
+            with stage("llm_call"):
+                started = time.perf_counter()
+                response = await model.generate_content_async(prompt, stream=True, **kwargs)
+                async for chunk in response:
+                    if not chunks:
+                        record_stage("llm_first_chunk", time.perf_counter() - started)
+                    chunks += 1
+                    size += len(chunk.text)
+                    yield chunk.text
+    except Exception as e:
+        llm_errors.inc(current_endpoint(), type(e).__name__)
+        raise
+    llm_response_chars.observe(size, current_endpoint())
+
+
+# --- Response Parsing ---
+# Counts of replies parsed as-is, parsed after repair, re-requested, and given up on after the last retry.
+response_stats = {"parsed": 0, "repaired": 0, "retried": 0, "failed": 0}
+
+
+def repair_json(text):
+    """Parses near-JSON: prose around the object and trailing commas.
+
+    Output cut off mid-object is not closed up, since whatever it was cut from is lost; it raises
+    ValueError like anything else that does not parse, so the caller can ask again.
+    """
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object found in the response.")
+    out = []
+    depth = 0
+    in_string = escaped = False
+    # Index in `out` of a comma that only whitespace has followed so far; dropped if a bracket closes next.
+    pending_comma = None
+    for ch in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch in "}]":
+            if pending_comma is not None:
+                del out[pending_comma]
+            depth -= 1
+        elif ch in "{[":
+            depth += 1
+        elif ch == '"':
+            in_string = True
+        if not ch.isspace() or in_string:
+            pending_comma = len(out) if ch == "," and not in_string else None
+        out.append(ch)
+        if not depth:
+            break
+    else:
+        raise ValueError("The JSON in the response is truncated.")
+    try:
+        return json.loads("".join(out))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not repair the JSON in the response: {e}")
+
+
+def parse_json_response(text, schema=None):
+    """Parses a Gemini JSON reply, repairing it if needed, and validates it against the pydantic `schema` if given.
+
+    Returns (parsed, repaired).
+    """
+    with stage("json_parse"):
+        cleaned_response = text.strip().replace("```json", "").replace("```", "").strip()
+        try:
+            parsed = json.loads(cleaned_response)
+            repaired = False
+        except json.JSONDecodeError:
+            parsed = repair_json(cleaned_response)
+            repaired = True
+        if schema is not None:
+            parsed = schema.model_validate(parsed).model_dump()
+    response_stats["repaired" if repaired else "parsed"] += 1
+    return parsed, repaired
+
+
+async def generate_parsed(model, prompt, schema=None, generation_config=None, retries=LLM_JSON_RETRIES):
+    """Returns (parsed, repaired) for the first usable reply.
+
+    Only a reply that is still unusable after repair costs another Gemini call, at most `retries` times.
+    """
+    kwargs = {"generation_config": generation_config} if generation_config else {}
+    for attempt in range(retries + 1):
+        response = await generate_content(model, prompt, **kwargs)
+        try:
+            text = response.text
+            llm_response_chars.observe(len(text), current_endpoint())
+            return parse_json_response(text, schema)
+        except ValueError:
+            # json.JSONDecodeError and pydantic's ValidationError are both ValueErrors.
+            if attempt >= retries:
+                response_stats["failed"] += 1
+                raise
+            response_stats["retried"] += 1
+
+
+_inflight = {}
+
+
+async def cached_result(cache_key, cache=None):
+    """Returns the cached result for `cache_key`, waiting for an identical call already in flight; None on a miss."""
+    with stage("result_cache"):
+        cached = await (cache or result_cache).get(cache_key)
+    if cached is not None:
+        return cached
+    # Identical prompts already in flight share one Gemini call.
+    pending = _inflight.get(cache_key)
+    if pending is not None:
+        try:
+            return json.loads(await asyncio.shield(pending))
+        except asyncio.CancelledError:
+            # The caller that owned the call went away or gave up; only give up if we were cancelled too.
+            if not pending.cancelled():
+                raise
+    return None
+
+
+class InflightCall:
+    """Marks the caller as generating `cache_key`, so identical requests wait in cached_result instead of calling Gemini.
+
+    The owner calls publish() with its result; if it leaves without doing so, or calls abandon(), waiters make their own call.
+    """
+
+    def __init__(self, cache_key, cache=None):
+        self.cache_key = cache_key
+        self.cache = cache or result_cache
+        self.future = None
+
+    async def __aenter__(self):
+        self.future = asyncio.get_running_loop().create_future()
+        _inflight[self.cache_key] = self.future
+        return self
+
+    async def publish(self, result, repaired=False):
+        # Waiters get the result before it is written to the cache's disk tier. Repaired replies are not cached.
+        self.future.set_result(json.dumps(result))
+        if not repaired:
+            await self.cache.set(self.cache_key, result)
+
+    def abandon(self):
+        if not self.future.done():
+            self.future.cancel()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if isinstance(exc, Exception) and not self.future.done():
+            self.future.set_exception(exc)
+            # Mark the exception as retrieved so an unawaited future does not log a warning.
+            self.future.exception()
+        self.abandon()
+        if _inflight.get(self.cache_key) is self.future:
+            del _inflight[self.cache_key]
+        return False
+
+
+async def generate_json(model, prompt, cache_key=None, bypass_cache=False, cache=None, schema=None, generation_config=None):
+    """Returns the parsed JSON reply for `prompt`, serving repeats from the result cache.
+
+    With `bypass_cache` the cached entry is ignored but still replaced by the fresh result.
+    Replies that needed repair are returned but not cached, so a retry can get a clean one.
+    """
+    if not cache_key:
+        json_response, _ = await generate_parsed(model, prompt, schema, generation_config)
+        return json_response
+    if not bypass_cache:
+        cached = await cached_result(cache_key, cache)
+        if cached is not None:
+            return cached
+    async with InflightCall(cache_key, cache) as call:
+        json_response, repaired = await generate_parsed(model, prompt, schema, generation_config)
+        await call.publish(json_response, repaired)
+        return json_response
@@ -1,20 +1,36 @@
 import os
-import json
 import re
+import shutil
+import asyncio
+import tempfile
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import pypdf
 import google.generativeai as genai
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends, status
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends, Header, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 import firebase_admin
-from firebase_admin import credentials, auth
+from firebase_admin import credentials
 
 load_dotenv()
 
+# Local modules read their settings from the environment at import time.
+from llm import InflightCall, LLMQueueFull, cached_result, generate_json, llm_gate, response_stats, stream_content, parse_json_response
+from cache import make_cache_key, result_cache
+from streaming import IncrementalJSONParser, sse_event
+from batch import BATCH_MAX_REQUEST_BYTES, BATCH_SPOOL_DIR, BatchInputError, BatchJobStore, BatchRunner, expand_uploads
+from auth_cache import KeySource, TokenVerifier
+from ingest import UPLOAD_FORM_OVERHEAD_BYTES, PDFTooLarge, UploadLimitMiddleware, pdf_ingestor
+from preprocess import compact_resume, estimate_tokens, find_project_section, resume_summary, token_stats
+from sessions import session_store
+from schemas import GeneratedQuestions, ProjectQuestions, ResumeAnalysis
+from metrics import PROFILE_ALLOWED_UIDS, MetricsMiddleware, profile_store, registry, stage, timed
+
 # --- Firebase Admin SDK Initialization ---
 try:
     cred = credentials.Certificate("firebase-service-account.json")
@@ -34,16 +50,43 @@ except Exception as e:
     print(f"CRITICAL: Error configuring Gemini: {e}")
     exit()
 
+# --- Token Verification ---
+# Verified ID tokens are cached until they expire, and signing certificates are prefetched in the background.
+key_source = KeySource()
+token_verifier = TokenVerifier(cred.project_id, key_source)
+
+@asynccontextmanager
+async def lifespan(app):
+    key_source.start()
+    await asyncio.to_thread(pdf_ingestor.warm_up)
+    yield
+    key_source.stop()
+    pdf_ingestor.shutdown()
+
 # --- FastAPI App & CORS ---
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 origins = [
     "http://localhost:3000",
     "https://cashewnuts2.netlify.app"
 ]
+# Added before CORS so CORS wraps it and browsers can read the 413.
+upload_limit = pdf_ingestor.max_bytes + UPLOAD_FORM_OVERHEAD_BYTES
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/analyze-resume/": upload_limit,
+    "/analyze-resume/stream/": upload_limit,
+    "/batch/analyze-resumes/": BATCH_MAX_REQUEST_BYTES + UPLOAD_FORM_OVERHEAD_BYTES,
+})
 app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+# Looked up per call so a verifier swapped in later (e.g. by the benchmarks) is used.
+app.add_middleware(MetricsMiddleware, verify_token=lambda token: token_verifier.verify(token))
+
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
 
 
 # --- Gemini Prompt Templates ---
+# Bump PROMPT_VERSION whenever a template changes so cached results from the old wording are not served.
+PROMPT_VERSION = "3"
+
 prompt_initial_analysis = """
 You are an expert AI assistant acting as a highly critical, unbiased, Senior Staff Engineer conducting a pre-screen analysis. Your standards are exceptionally high. Your goal is to rigorously evaluate a candidate's resume against a job description.
 
@@ -93,9 +136,14 @@ You are a technical interviewer drilling down on a specific project from a candi
 
 **Project Name:** "{project_name}"
 
-**Full Resume Text:**
+**Project Details From the Resume:**
 \"\"\"
-{resume_text}
+{project_section}
+\"\"\"
+
+**Candidate Summary:**
+\"\"\"
+{resume_summary}
 \"\"\"
 
 **Instructions:**
@@ -115,17 +163,115 @@ Generate a single, valid JSON object containing an array of 3-4 highly specific
 }}
 """
 
+prompt_question_generation = """
+You are an expert AI assistant acting as a highly critical Senior Staff Engineer preparing interview questions for a candidate. Every question must be grounded in the resume and relevant to the job description.
+
+**Job Description:**
+\"\"\"
+{job_description}
+\"\"\"
+
+**Candidate's Resume Text:**
+\"\"\"
+{resume_text}
+\"\"\"
+
+**Instructions:**
+1.  **Scope:** Generate {scope}.
+2.  **Difficulty Level:** Generate questions with an average difficulty targeted at **{difficulty} out of 5**.
+3.  **Output Format:** Generate a single, valid JSON object with no other text or markdown.
+
+**JSON Structure:**
+{{
+  "categories": [
+    {{
+      "category": "Core Technical Skills",
+      "questions": [
+        {{
+          "question": "A deep, specific question about a core technology.",
+          "difficulty": <number 1-5>,
+          "expectedAnswer": "A detailed, ideal answer demonstrating true expertise.",
+          "keywords": ["keywords", "to", "listen", "for"],
+          "nonTechnicalExplanation": "For the HR partner: This question tests..."
+        }}
+      ]
+    }}
+  ]
+}}
+"""
+
+# --- Gemini Output Modes ---
+# Drill-down and question generation are constrained to their schema. The analysis keys questions by category,
+# a free-form map Gemini's response_schema cannot express, so it only gets JSON mode and is validated afterwards.
+JSON_OUTPUT = {"response_mime_type": "application/json"}
+
+def schema_output(schema):
+    return {**JSON_OUTPUT, "response_schema": schema}
+
 # --- Helper Functions and Auth ---
-def extract_pdf_text(file_stream):
-    try:
-        pdf_reader = pypdf.PdfReader(file_stream)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-        return text
-    except Exception as e:
-        raise ValueError(f"Error reading PDF: {e}")
+@timed("preprocess")
+def build_resume(raw_text, pages=None):
+    # Prompts get the compacted text; date analysis and rawResumeText keep the text exactly as extracted.
+    compact_text, sections = compact_resume(pages if pages is not None else [raw_text])
+    return {"resumeText": raw_text, "compactText": compact_text, "sections": sections}
+
+def extraction_report(ingested):
+    # Pages past PDF_MAX_PAGES and pages that timed out are analysed as missing, so clients can warn the user.
+    return {
+        "pageCount": ingested.page_count,
+        "pagesRead": len(ingested.pages),
+        "truncated": ingested.truncated,
+        "timedOutPages": [index + 1 for index in ingested.timed_out_pages],
+    }
+
+# Text extraction runs on pdf_ingestor's process pool; repeated uploads of the same file are served from its cache.
+async def extract_resume(upload):
+    with stage("pdf_extract"):
+        ingested = await pdf_ingestor.ingest_upload(upload)
+    return {**build_resume(ingested.text, ingested.pages), "extraction": extraction_report(ingested)}
+
+@timed("prompt")
+def render_prompt(kind, template, raw_fields, compact_fields):
+    # Estimated tokens with the raw text vs. the compacted text, so the savings show up per request and in totals.
+    prompt = template.format(**compact_fields)
+    usage = token_stats.record(kind, estimate_tokens(template.format(**raw_fields)), estimate_tokens(prompt))
+    return prompt, usage
+
+def analysis_prompt(resume, job_description, difficulty):
+    return render_prompt(
+        "analysis", prompt_initial_analysis,
+        {"resume_text": resume["resumeText"], "job_description": job_description, "difficulty": difficulty},
+        {"resume_text": resume["compactText"], "job_description": job_description, "difficulty": difficulty},
+    )
+
+def drilldown_prompt(resume, project_name):
+    project_section = find_project_section(resume["sections"], project_name, resume.get("projectNames", []))
+    compact_fields = {
+        "project_name": project_name,
+        "project_section": project_section or resume["compactText"],
+        "resume_summary": resume_summary(resume["sections"]) if project_section else "",
+    }
+    raw_fields = {"project_name": project_name, "project_section": resume["resumeText"], "resume_summary": ""}
+    return render_prompt("drilldown", prompt_project_drilldown, raw_fields, compact_fields)
 
+def question_scope(category, count):
+    if category and count:
+        return f'exactly {count} questions, all in the "{category}" category'
+    if category:
+        return f'only questions for the "{category}" category'
+    if count:
+        return f"exactly {count} questions in total, grouped into the categories most relevant to the role"
+    return "questions grouped into the categories most relevant to the role"
+
+def question_prompt(resume, job_description, difficulty, category=None, count=None):
+    fields = {"job_description": job_description, "difficulty": difficulty, "scope": question_scope(category, count)}
+    return render_prompt(
+        "questions", prompt_question_generation,
+        {**fields, "resume_text": resume["resumeText"]},
+        {**fields, "resume_text": resume["compactText"]},
+    )
+
+@timed("work_history")
 def analyze_work_history(text):
     date_pattern = re.compile(
         r'\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\w*\s+(\d{4})\s*–\s*(Present|(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\w*\s+\d{4})\b',
@@ -170,14 +316,83 @@ def analyze_work_history(text):
             gaps.append(f"Potential {gap_months}-month gap found between '{current_job['text']}' and '{next_job['text']}'")
     return {"overlaps": overlaps, "gaps": gaps}
 
+def get_model():
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+async def generate_cached(model, prompt, schema, generation_config, bypass_cache=False):
+    cache_key = make_cache_key(PROMPT_VERSION, GEMINI_MODEL_NAME, prompt)
+    return await generate_json(model, prompt, cache_key=cache_key, bypass_cache=bypass_cache, schema=schema, generation_config=generation_config)
+
+def categorized_questions(json_response):
+    categorized = {}
+    for entry in json_response["categories"]:
+        categorized.setdefault(entry["category"], []).extend(entry["questions"])
+    return categorized
+
+def pdf_too_large_error(e):
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+def queue_full_error(e):
+    return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+# get_current_user is a plain def so FastAPI runs a cache-miss verification (and any certificate fetch) in its threadpool.
 token_auth_scheme = HTTPBearer()
 def get_current_user(cred: HTTPAuthorizationCredentials = Depends(token_auth_scheme)):
     try:
-        decoded_token = auth.verify_id_token(cred.credentials)
+        with stage("auth"):
+            decoded_token = token_verifier.verify(cred.credentials)
         return decoded_token
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid credentials: {e}")
 
+# The SQLite session store blocks on disk, so session reads and writes run in a thread like the batch job store.
+async def load_resume_session(user, resume_id, resume_text):
+    # Follow-up calls may send a resume_id from /analyze-resume/ or, for older clients, the full resume text.
+    if resume_id:
+        with stage("session"):
+            session = await asyncio.to_thread(session_store.get, user["uid"], resume_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Resume session not found or expired. Please upload the resume again.")
+        return session
+    if resume_text:
+        return build_resume(resume_text)
+    raise HTTPException(status_code=422, detail="Either resume_id or resume_text is required.")
+
+async def create_resume_session(user, resume, job_description, date_analysis_results, json_response):
+    with stage("session"):
+        return await asyncio.to_thread(session_store.create, user["uid"], {
+            **resume,
+            "jobDescription": job_description,
+            "dateAnalysis": date_analysis_results,
+            "projectNames": json_response.get("projectNames", []),
+        })
+
+# --- Streaming Helpers ---
+STREAM_EVENT_NAMES = {
+    "candidateName": "candidate",
+    "confidenceScore": "score",
+    "potentialInconsistencies": "inconsistencies",
+    "projectNames": "projects",
+}
+
+def analysis_events(path, value):
+    # Question categories are sent one by one; the complete categorizedQuestions object is skipped.
+    if path[0] == "categorizedQuestions":
+        if len(path) == 2:
+            return [sse_event("questions", {"category": path[1], "questions": value})]
+        return []
+    return [sse_event(STREAM_EVENT_NAMES.get(path[0], path[0]), {path[0]: value})]
+
+def cached_analysis_events(json_response):
+    events = []
+    for key, value in json_response.items():
+        if key == "categorizedQuestions" and isinstance(value, dict):
+            for category, questions in value.items():
+                events.extend(analysis_events((key, category), questions))
+        else:
+            events.extend(analysis_events((key,), value))
+    return events
+
 # --- API Endpoints ---
 @app.get("/")
 def read_root(): return {"message": "Resume Analyzer API is running."}
@@ -187,49 +402,225 @@ async def analyze_resume(user: dict = Depends(get_current_user), file: UploadFil
     if not file.content_type == "application/pdf":
         raise HTTPException(status_code=400, detail="Please upload a PDF.")
     try:
-        resume_text = extract_pdf_text(file.file)
-        date_analysis_results = analyze_work_history(resume_text)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = prompt_initial_analysis.format(resume_text=resume_text, job_description=job_description, difficulty=difficulty)
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().replace("```json", "").replace("```", "").strip()
-        json_response = json.loads(cleaned_response)
+        resume = await extract_resume(file)
+        date_analysis_results = analyze_work_history(resume["resumeText"])
+        model = get_model()
+        prompt, prompt_tokens = analysis_prompt(resume, job_description, difficulty)
+        json_response = await generate_cached(model, prompt, ResumeAnalysis, JSON_OUTPUT)
         json_response["dateAnalysis"] = date_analysis_results
-        json_response["rawResumeText"] = resume_text
+        json_response["resumeId"] = await create_resume_session(user, resume, job_description, date_analysis_results, json_response)
+        json_response["rawResumeText"] = resume["resumeText"]
         json_response["jobDescription"] = job_description
+        json_response["promptTokens"] = prompt_tokens
+        json_response["extraction"] = resume["extraction"]
         return json_response
+    except PDFTooLarge as e:
+        raise pdf_too_large_error(e)
+    except LLMQueueFull as e:
+        raise queue_full_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+
+@app.post("/analyze-resume/stream/")
+async def analyze_resume_stream(user: dict = Depends(get_current_user), file: UploadFile = File(...), job_description: str = Form(...), difficulty: int = Form(...)):
+    if not file.content_type == "application/pdf":
+        raise HTTPException(status_code=400, detail="Please upload a PDF.")
+    try:
+        resume = await extract_resume(file)
+    except PDFTooLarge as e:
+        raise pdf_too_large_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+    date_analysis_results = analyze_work_history(resume["resumeText"])
+    prompt, prompt_tokens = analysis_prompt(resume, job_description, difficulty)
+    cache_key = make_cache_key(PROMPT_VERSION, GEMINI_MODEL_NAME, prompt)
+
+    async def events():
+        yield sse_event("dateAnalysis", {"dateAnalysis": date_analysis_results})
+        try:
+            # Shares the result cache and in-flight calls with /analyze-resume/, which sends the same prompt.
+            json_response = await cached_result(cache_key)
+            if json_response is not None:
+                for event in cached_analysis_events(json_response):
+                    yield event
+            else:
+                async with InflightCall(cache_key) as call:
+                    parser = IncrementalJSONParser(expand=["categorizedQuestions"])
+                    async for chunk in stream_content(get_model(), prompt, generation_config=JSON_OUTPUT):
+                        for path, value in parser.feed(chunk):
+                            for event in analysis_events(path, value):
+                                yield event
+                    try:
+                        json_response, repaired = parse_json_response(parser.text, ResumeAnalysis)
+                    except ValueError as e:
+                        # Events already sent came from a bad reply. A stream cannot retry it, so the client is told to,
+                        # and waiting requests make their own call with generate_json's bounded retry.
+                        response_stats["failed"] += 1
+                        call.abandon()
+                        yield sse_event("invalidResponse", {"detail": f"The analysis came back malformed or incomplete, please retry: {e}"})
+                        return
+                    await call.publish(json_response, repaired)
+            yield sse_event("done", {
+                "resumeId": await create_resume_session(user, resume, job_description, date_analysis_results, json_response),
+                "rawResumeText": resume["resumeText"],
+                "jobDescription": job_description,
+                "promptTokens": prompt_tokens,
+                "extraction": resume["extraction"],
+            })
+        except LLMQueueFull as e:
+            yield sse_event("error", {"detail": str(e), "retryAfter": e.retry_after})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"An unexpected error occurred: {e}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 class ProjectDrilldownRequest(BaseModel):
-    resume_text: str
     project_name: str
+    resume_id: Optional[str] = None
+    resume_text: Optional[str] = None
 
 @app.post("/project-questions/")
 async def get_project_questions(request: ProjectDrilldownRequest, user: dict = Depends(get_current_user)):
+    session = await load_resume_session(user, request.resume_id, request.resume_text)
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = prompt_project_drilldown.format(resume_text=request.resume_text, project_name=request.project_name)
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().replace("```json", "").replace("```", "").strip()
-        json_response = json.loads(cleaned_response)
+        model = get_model()
+        prompt, prompt_tokens = drilldown_prompt(session, request.project_name)
+        json_response = await generate_cached(model, prompt, ProjectQuestions, schema_output(ProjectQuestions))
+        json_response["promptTokens"] = prompt_tokens
         return json_response
+    except LLMQueueFull as e:
+        raise queue_full_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during project drill-down: {e}")
 
 class RegenerateRequest(BaseModel):
-    resume_text: str
-    job_description: str
     difficulty: int
+    resume_id: Optional[str] = None
+    resume_text: Optional[str] = None
+    job_description: Optional[str] = None
+    category: Optional[str] = None
+    count: Optional[int] = Field(default=None, ge=1, le=10)
+    bypass_cache: bool = False
 
 @app.post("/regenerate-questions/")
 async def regenerate_questions(request: RegenerateRequest, user: dict = Depends(get_current_user)):
+    session = await load_resume_session(user, request.resume_id, request.resume_text)
+    job_description = request.job_description or session.get("jobDescription")
+    if not job_description:
+        raise HTTPException(status_code=422, detail="job_description is required when regenerating without a resume_id.")
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = prompt_initial_analysis.format(resume_text=request.resume_text, job_description=request.job_description, difficulty=request.difficulty)
-        response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().replace("```json", "").replace("```", "").strip()
-        json_response = json.loads(cleaned_response)
-        return {"categorizedQuestions": json_response.get("categorizedQuestions", {})}
+        model = get_model()
+        prompt, prompt_tokens = question_prompt(session, job_description, request.difficulty, request.category, request.count)
+        json_response = await generate_cached(model, prompt, GeneratedQuestions, schema_output(GeneratedQuestions), bypass_cache=request.bypass_cache)
+        return {"categorizedQuestions": categorized_questions(json_response), "promptTokens": prompt_tokens}
+    except LLMQueueFull as e:
+        raise queue_full_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error during question regeneration: {e}")
+
+# --- Batch Screening ---
+async def extract_pdf_file(path):
+    with stage("pdf_extract"):
+        ingested = await pdf_ingestor.ingest_file(path)
+    return {**build_resume(ingested.text, ingested.pages), "extraction": extraction_report(ingested)}
+
+async def analyze_batch_resume(resume, job_description, difficulty):
+    prompt, _ = analysis_prompt(resume, job_description, difficulty)
+    json_response = await generate_cached(get_model(), prompt, ResumeAnalysis, JSON_OUTPUT)
+    json_response["dateAnalysis"] = analyze_work_history(resume["resumeText"])
+    json_response["extraction"] = resume["extraction"]
+    return json_response
+
+batch_runner = BatchRunner(BatchJobStore(), extract_pdf_file, analyze_batch_resume)
+BATCH_POLL_SECONDS = 0.5
+
+@app.post("/batch/analyze-resumes/", status_code=status.HTTP_202_ACCEPTED)
+async def submit_batch(user: dict = Depends(get_current_user), files: List[UploadFile] = File(...), job_description: str = Form(...), difficulty: int = Form(...)):
+    # Uploads are spooled to a per-job directory and the runner gets file paths, so a batch is never held in memory.
+    uploads = [(file.filename or "resume.pdf", file.file) for file in files]
+    spool_dir = tempfile.mkdtemp(prefix="batch-", dir=BATCH_SPOOL_DIR)
+    try:
+        resumes = await asyncio.to_thread(expand_uploads, uploads, spool_dir)
+    except Exception as e:
+        await asyncio.to_thread(shutil.rmtree, spool_dir, ignore_errors=True)
+        if isinstance(e, BatchInputError):
+            raise HTTPException(status_code=400, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {e}")
+    job_id = await batch_runner.submit(user["uid"], job_description, difficulty, resumes, spool_dir)
+    return {"jobId": job_id, "total": len(resumes)}
+
+@app.get("/batch/{job_id}/")
+def get_batch(job_id: str, user: dict = Depends(get_current_user)):
+    job = batch_runner.store.get_job(user["uid"], job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found.")
+    return job
+
+@app.get("/batch/{job_id}/stream/")
+async def stream_batch(job_id: str, user: dict = Depends(get_current_user)):
+    job = await asyncio.to_thread(batch_runner.store.get_job, user["uid"], job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found.")
+
+    async def events():
+        since = None
+        while True:
+            job = await asyncio.to_thread(batch_runner.store.get_job, user["uid"], job_id, since=since)
+            for candidate in job["candidates"]:
+                since = max(since or 0, candidate["updatedAt"])
+                if candidate["status"] in ("completed", "failed"):
+                    yield sse_event("candidate", candidate)
+            yield sse_event("progress", {"status": job["status"], "total": job["total"], "counts": job["counts"]})
+            if job["status"] != "running":
+                ranked = (await asyncio.to_thread(batch_runner.store.get_job, user["uid"], job_id))["candidates"]
+                yield sse_event("done", {"ranking": [
+                    {"index": c["index"], "filename": c["filename"], "status": c["status"], "confidenceScore": c["confidenceScore"]}
+                    for c in ranked
+                ]})
+                return
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --- Metrics & Profiling ---
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+def component_metrics():
+    # Stats the caches, token verifier and LLM gate already keep, read at scrape time.
+    cache = result_cache.stats()
+    tokens = token_verifier.stats()
+    pdf = pdf_ingestor.stats()
+    prompts = token_stats.snapshot()
+    return [
+        ("llm_gate_active", "gauge", "Gemini calls in flight.", [({}, llm_gate.active)]),
+        ("llm_gate_waiting", "gauge", "Callers waiting for a Gemini slot.", [({}, llm_gate.waiting)]),
+        ("llm_json_responses_total", "counter", "Gemini replies by parse outcome; retried and failed replies cost another call or a 500.",
+         [({"outcome": outcome}, count) for outcome, count in response_stats.items()]),
+        ("result_cache_events_total", "counter", "Result cache lookups and removals.",
+         [({"event": event}, cache[key]) for event, key in (("hit", "hits"), ("disk_hit", "diskHits"), ("miss", "misses"), ("eviction", "evictions"), ("disk_eviction", "diskEvictions"), ("expiration", "expirations"))]),
+        ("result_cache_bytes", "gauge", "Bytes held by the in-memory result cache.", [({}, cache["bytes"])]),
+        ("token_cache_events_total", "counter", "ID token cache lookups and outcomes.",
+         [({"event": event}, tokens[key]) for event, key in (("hit", "hits"), ("miss", "misses"), ("failure", "failures"), ("eviction", "evictions"))]),
+        ("token_verify_seconds_total", "counter", "Time spent verifying ID token signatures on cache misses.", [({}, tokens["verifySecondsTotal"])]),
+        ("pdf_cache_events_total", "counter", "Extracted-text cache lookups.", [({"event": "hit"}, pdf["cacheHits"]), ({"event": "miss"}, pdf["cacheMisses"])]),
+        ("pdf_truncated_total", "counter", "PDFs cut at PDF_MAX_PAGES and analysed without the remaining pages.", [({}, pdf["truncatedDocuments"])]),
+        ("pdf_page_timeouts_total", "counter", "PDF pages whose text extraction timed out and was left empty.", [({}, pdf["timedOutPages"])]),
+        ("prompt_tokens_estimated_total", "counter", "Estimated prompt tokens before and after resume compaction.",
+         [({"kind": kind, "text": text}, totals[key]) for kind, totals in prompts.items() for text, key in (("raw", "rawTokens"), ("compacted", "compactedTokens"))]),
+    ]
+
+registry.add_collector(component_metrics)
+
+@app.get("/metrics")
+def get_metrics(authorization: Optional[str] = Header(default=None)):
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token.")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Requests sent with "X-Profile: 1" by a user in PROFILE_ALLOWED_UIDS are profiled by MetricsMiddleware.
+@app.get("/debug/profiles/{profile_id}/")
+def get_profile(profile_id: str, user: dict = Depends(get_current_user)):
+    profile = profile_store.get(profile_id) if user["uid"] in PROFILE_ALLOWED_UIDS else None
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return PlainTextResponse(profile)
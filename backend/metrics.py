@@ -0,0 +1,289 @@
+import os
+import io
+import time
+import pstats
+import asyncio
+import cProfile
+import secrets
+import threading
+import contextvars
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+# --- Metrics Settings ---
+PROFILE_ALLOWED_UIDS = {uid.strip() for uid in os.getenv("PROFILE_ALLOWED_UIDS", "").split(",") if uid.strip()}
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "20"))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "40"))
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(list(zip(self.labelnames, labels)))} {value}" for labels, value in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self):
+        """Returns {labels: (count, sum)}."""
+        with self._lock:
+            return {labels: (count, total) for labels, (_, total, count) in self._values.items()}
+
+    def render(self):
+        with self._lock:
+            values = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in values:
+            pairs = list(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {count}")
+        return lines
+
+
+class Registry:
+    """Renders metrics in the Prometheus text format.
+
+    Collectors are callables returning (name, type, help, [(labels_dict, value)]) families,
+    for stats other modules already keep (caches, token verifier, LLM gate) read at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_format_labels(sorted(labels.items()))} {value}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+http_requests = registry.counter("http_requests_total", "Requests by endpoint, method and status code.", ("endpoint", "method", "status"))
+http_request_seconds = registry.histogram("http_request_duration_seconds", "Request latency, including the full body of streamed responses.", ("endpoint", "method"))
+stage_seconds = registry.histogram("stage_duration_seconds", "Time spent in each stage of handling a request.", ("endpoint", "stage"))
+llm_prompt_chars = registry.histogram("llm_prompt_chars", "Size of prompts sent to Gemini.", ("endpoint",), SIZE_BUCKETS)
+llm_response_chars = registry.histogram("llm_response_chars", "Size of replies received from Gemini.", ("endpoint",), SIZE_BUCKETS)
+llm_errors = registry.counter("llm_errors_total", "Failed Gemini calls by exception type, including queue rejections.", ("endpoint", "error"))
+batch_retries = registry.counter("batch_retries_total", "Batch candidates re-queued after a failed analysis, by exception type.", ("error",))
+
+
+# --- Per-Request Stage Timing ---
+_current_request = contextvars.ContextVar("current_request", default=None)
+
+
+class RequestMetrics:
+    def __init__(self, scope):
+        self.scope = scope
+        self.stages = []
+
+    @property
+    def endpoint(self):
+        # The router stores the matched route in the scope, so the label is the path template, not the raw path.
+        route = self.scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+
+def current_endpoint():
+    request = _current_request.get()
+    return request.endpoint if request is not None else "background"
+
+
+def record_stage(name, seconds):
+    # Context variables follow the request into threadpool calls and tasks it starts, such as batch jobs.
+    request = _current_request.get()
+    stage_seconds.observe(seconds, request.endpoint if request is not None else "background", name)
+    if request is not None:
+        request.stages.append((name, seconds))
+
+
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def timed(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Profiling ---
+class ProfileStore:
+    """Keeps the most recent request profiles as pstats text, keyed by a random id."""
+
+    def __init__(self, max_entries=PROFILE_MAX_STORED):
+        self.max_entries = max_entries
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile_id, text):
+        with self._lock:
+            self._profiles[profile_id] = text
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+profile_store = ProfileStore()
+# cProfile hooks the whole event loop thread, so only one request is profiled at a time.
+_profile_lock = threading.Lock()
+
+
+def _profile_text(profiler, request):
+    out = io.StringIO()
+    out.write(f"{request.scope['method']} {request.scope['path']}\n")
+    out.write("".join(f"stage {name}: {seconds * 1000:.1f} ms\n" for name, seconds in request.stages) + "\n")
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and profiles it when an allow-listed user sends `X-Profile: 1`.
+
+    `verify_token(token)` returns the caller's claims; it only runs for requests asking to be profiled.
+    Profiles cover everything on the event loop thread while the request runs, so they are clearest
+    on an otherwise idle instance. The response carries X-Profile-Id and a Server-Timing header.
+    """
+
+    def __init__(self, app, verify_token=None):
+        self.app = app
+        self.verify_token = verify_token
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = RequestMetrics(scope)
+        context_token = _current_request.set(request)
+        profiler = profile_id = None
+        profile_status = None
+        if await self._profile_requested(scope):
+            if _profile_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+                profile_id = secrets.token_urlsafe(12)
+            else:
+                profile_status = "busy"
+        status_code = 500
+
+        async def send_with_metrics(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if profile_id or profile_status:
+                    headers = list(message.get("headers", []))
+                    if profile_id:
+                        headers.append((b"x-profile-id", profile_id.encode()))
+                        timing = ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in request.stages)
+                        if timing:
+                            headers.append((b"server-timing", timing.encode()))
+                    else:
+                        headers.append((b"x-profile-status", profile_status.encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        started = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _profile_lock.release()
+                profile_store.add(profile_id, _profile_text(profiler, request))
+            elapsed = time.perf_counter() - started
+            http_request_seconds.observe(elapsed, request.endpoint, scope["method"])
+            http_requests.inc(request.endpoint, scope["method"], str(status_code))
+            _current_request.reset(context_token)
+
+    async def _profile_requested(self, scope):
+        if not PROFILE_ALLOWED_UIDS or self.verify_token is None:
+            return False
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile", b"").strip() not in (b"1", b"true"):
+            return False
+        scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        try:
+            # A cache miss may fetch signing certificates, so it runs off the event loop like get_current_user.
+            claims = await asyncio.to_thread(self.verify_token, token)
+        except Exception:
+            return False
+        return claims.get("uid") in PROFILE_ALLOWED_UIDS
@@ -0,0 +1,174 @@
+import re
+import math
+import threading
+from collections import Counter
+
+# --- Resume Preprocessing ---
+SECTION_HEADINGS = {
+    "summary": ("summary", "profile", "professional summary", "about me", "objective", "career objective"),
+    "experience": ("experience", "work experience", "professional experience", "employment", "employment history", "work history", "career history"),
+    "projects": ("projects", "personal projects", "key projects", "academic projects", "selected projects", "side projects"),
+    "skills": ("skills", "technical skills", "core skills", "key skills", "technologies", "tech stack", "core competencies"),
+    "education": ("education", "academic background", "qualifications", "education and training"),
+    "certifications": ("certifications", "certificates", "licenses", "courses"),
+    "achievements": ("achievements", "awards", "honors", "honours", "publications"),
+}
+HEADING_LOOKUP = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+EDGE_LINES = 3
+SUMMARY_MAX_CHARS = 600
+PROJECT_MAX_LINES = 25
+
+
+def estimate_tokens(text):
+    # Gemini averages roughly four characters per token for English prose; counting exactly would cost an API call.
+    return math.ceil(len(text) / 4)
+
+
+def normalize_whitespace(text):
+    lines = [re.sub(r"[^\S\n]+", " ", line).strip() for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+PAGE_NUMBER = re.compile(r"\bpage\s+\d+(?:\s*(?:of|/)\s*\d+)?\b|^[-–\s]*\d+(?:\s*(?:of|/)\s*\d+)?[-–\s]*$")
+
+
+def _line_signature(line):
+    # Only page numbers are masked, so "Page 2 of 3" and "Page 3 of 3" match but two date ranges do not.
+    return PAGE_NUMBER.sub("#", line.strip().lower())
+
+
+def _edge_positions(content):
+    """Maps line index -> edge positions ("top", n) / ("bottom", n) for the first and last content lines."""
+    positions = {}
+    for n, i in enumerate(content[:EDGE_LINES]):
+        positions.setdefault(i, []).append(("top", n))
+    for n, i in enumerate(reversed(content[-EDGE_LINES:])):
+        positions.setdefault(i, []).append(("bottom", n))
+    return positions
+
+
+def strip_repeated_lines(pages):
+    """Drops repeats of header and footer lines that recur at the same edge position on most pages.
+
+    A two-page resume only counts a line as a header or footer when it is on both pages in the same position.
+    """
+    if len(pages) < 2:
+        return list(pages)
+    page_lines = [page.splitlines() for page in pages]
+    page_edges = []
+    counts = Counter()
+    for lines in page_lines:
+        edges = _edge_positions([i for i, line in enumerate(lines) if line.strip()])
+        page_edges.append(edges)
+        counts.update({(position, _line_signature(lines[i])) for i, positions in edges.items() for position in positions})
+    threshold = len(pages) if len(pages) < 3 else max(2, math.ceil(len(pages) / 2))
+    repeated = {signature for signature, count in counts.items() if count >= threshold}
+    if not repeated:
+        return list(pages)
+    # The first occurrence is kept, since a running header usually carries the candidate's name.
+    seen = set()
+    stripped = []
+    for lines, edges in zip(page_lines, page_edges):
+        kept = []
+        for i, line in enumerate(lines):
+            signature = _line_signature(line)
+            if any((position, signature) in repeated for position in edges.get(i, ())):
+                if signature in seen:
+                    continue
+                seen.add(signature)
+            kept.append(line)
+        stripped.append("\n".join(kept))
+    return stripped
+
+
+def _heading_section(line):
+    candidate = line.strip().strip(":").strip().lower()
+    if not candidate or len(candidate) > 40:
+        return None
+    return HEADING_LOOKUP.get(candidate)
+
+
+def split_sections(text):
+    """Splits normalized resume text into {section: text}; anything before the first heading is "header"."""
+    sections = {}
+    current = "header"
+    buffer = []
+    for line in text.splitlines():
+        section = _heading_section(line)
+        if section:
+            if buffer:
+                sections[current] = (sections.get(current, "") + "\n" + "\n".join(buffer)).strip()
+            current = section
+            buffer = []
+        else:
+            buffer.append(line)
+    if buffer:
+        sections[current] = (sections.get(current, "") + "\n" + "\n".join(buffer)).strip()
+    return sections
+
+
+def compact_resume(pages):
+    """Returns (compact_text, sections) for a resume given its per-page text."""
+    text = normalize_whitespace("\n".join(strip_repeated_lines(pages)))
+    return text, split_sections(text)
+
+
+def resume_summary(sections, max_chars=SUMMARY_MAX_CHARS):
+    parts = [sections[name] for name in ("header", "summary", "skills") if sections.get(name)]
+    summary = "\n".join(parts)
+    return summary if len(summary) <= max_chars else summary[:max_chars].rsplit(" ", 1)[0] + " ..."
+
+
+def _name_tokens(name):
+    return {token for token in re.findall(r"[a-z0-9]+", name.lower()) if len(token) > 2}
+
+
+def find_project_section(sections, project_name, other_projects=(), max_lines=PROJECT_MAX_LINES):
+    """Returns the lines describing `project_name`, or None if it cannot be located.
+
+    Looks in the projects section first, then experience, then everything else. The block runs
+    from the line that names the project to a blank line, another known project or max_lines.
+    """
+    wanted = project_name.lower().strip()
+    # Word boundaries, so a short name like "API" does not match inside "Rapid".
+    pattern = re.compile(rf"(?<!\w){re.escape(wanted)}(?!\w)")
+    tokens = _name_tokens(project_name)
+    others = [other.lower() for other in other_projects if other.lower().strip() != wanted]
+    order = ["projects", "experience"] + [name for name in sections if name not in ("projects", "experience")]
+    for name in order:
+        lines = sections.get(name, "").splitlines()
+        start = next((i for i, line in enumerate(lines) if pattern.search(line.lower())), None)
+        if start is None and tokens:
+            start = next((i for i, line in enumerate(lines) if tokens <= _name_tokens(line)), None)
+        if start is None:
+            continue
+        block = [lines[start]]
+        for line in lines[start + 1:start + max_lines]:
+            if not line.strip() or any(re.search(rf"(?<!\w){re.escape(other)}(?!\w)", line.lower()) for other in others):
+                break
+            block.append(line)
+        return "\n".join(block)
+    return None
+
+
+class TokenStats:
+    """Running totals of estimated prompt tokens before and after compaction, per prompt kind."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = {}
+
+    def record(self, kind, raw_tokens, compacted_tokens):
+        with self._lock:
+            entry = self.totals.setdefault(kind, {"requests": 0, "rawTokens": 0, "compactedTokens": 0})
+            entry["requests"] += 1
+            entry["rawTokens"] += raw_tokens
+            entry["compactedTokens"] += compacted_tokens
+        return {"raw": raw_tokens, "compacted": compacted_tokens}
+
+    def snapshot(self):
+        with self._lock:
+            return {kind: dict(entry) for kind, entry in self.totals.items()}
+
+
+token_stats = TokenStats()
@@ -0,0 +1,43 @@
+from typing import Dict, List
+
+from pydantic import BaseModel, ConfigDict
+
+# --- Gemini Response Schemas ---
+# Used to validate every reply, and as response_schema where Gemini's schema subset can express the shape
+# (it has no free-form maps or defaults, so categorizedQuestions is requested as a list of categories there).
+
+
+class Question(BaseModel):
+    question: str
+    difficulty: int
+    expectedAnswer: str
+    keywords: List[str]
+    nonTechnicalExplanation: str
+
+
+class ConfidenceScore(BaseModel):
+    score: int
+    justification: str = ""
+
+
+class ResumeAnalysis(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    candidateName: str = ""
+    confidenceScore: ConfidenceScore
+    potentialInconsistencies: List[str] = []
+    projectNames: List[str] = []
+    categorizedQuestions: Dict[str, List[Question]]
+
+
+class ProjectQuestions(BaseModel):
+    projectQuestions: List[Question]
+
+
+class QuestionCategory(BaseModel):
+    category: str
+    questions: List[Question]
+
+
+class GeneratedQuestions(BaseModel):
+    categories: List[QuestionCategory]
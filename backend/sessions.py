@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import sqlite3
+import secrets
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+# --- Resume Session Settings ---
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_DB = os.getenv("SESSION_DB", "sessions.db")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(12 * 60 * 60)))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class SessionStore(ABC):
+    """Keeps extracted resume text and derived data per Firebase uid so follow-up calls can send a resume_id."""
+
+    def create(self, uid, data):
+        resume_id = secrets.token_urlsafe(16)
+        self.save(uid, resume_id, data)
+        return resume_id
+
+    @abstractmethod
+    def get(self, uid, resume_id):
+        ...
+
+    @abstractmethod
+    def save(self, uid, resume_id, data):
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, ttl=SESSION_TTL_SECONDS, max_entries=SESSION_MAX_ENTRIES, max_bytes=SESSION_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, uid, resume_id):
+        key = (uid, resume_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return json.loads(value)
+
+    def save(self, uid, resume_id, data):
+        key = (uid, resume_id)
+        value = json.dumps(data)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._bytes += len(value)
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+
+class SQLiteSessionStore(SessionStore):
+    def __init__(self, path=SESSION_DB, ttl=SESSION_TTL_SECONDS, max_entries=SESSION_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "uid TEXT NOT NULL, resume_id TEXT NOT NULL, data TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL, "
+            "PRIMARY KEY (uid, resume_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, uid, resume_id):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE uid = ? AND resume_id = ? AND expires_at > ?", (uid, resume_id, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE sessions SET last_access = ? WHERE uid = ? AND resume_id = ?", (now, uid, resume_id))
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def save(self, uid, resume_id, data):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (uid, resume_id, data, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (uid, resume_id, json.dumps(data), now + self.ttl, now),
+            )
+            self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            overflow = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM sessions WHERE rowid IN (SELECT rowid FROM sessions ORDER BY last_access LIMIT ?)", (overflow,)
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+
+def create_session_store():
+    if SESSION_STORE == "sqlite":
+        return SQLiteSessionStore()
+    if SESSION_STORE == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"Unknown SESSION_STORE '{SESSION_STORE}', expected 'memory' or 'sqlite'")
+
+
+session_store = create_session_store()
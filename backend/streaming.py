@@ -0,0 +1,90 @@
+import json
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class _Frame:
+    def __init__(self, kind, path, emit):
+        self.kind = kind
+        self.path = path
+        self.emit = emit
+        self.key = None
+        self.expect_key = kind == "object"
+        self.value_start = None
+
+
+class IncrementalJSONParser:
+    """Scans a streamed JSON object and reports each top-level member as soon as its value is complete.
+
+    Members named in `expand` (e.g. "categorizedQuestions") also report their own members one by one.
+    Anything before the first "{" (such as a ```json fence) is ignored. feed() returns a list of
+    (path, value) tuples, where path is ("key",) or ("key", "subkey").
+    """
+
+    def __init__(self, expand=()):
+        self.expand = set(expand)
+        self.done = False
+        self._text = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+    @property
+    def text(self):
+        return self._text
+
+    def feed(self, chunk):
+        self._text += chunk
+        text = self._text
+        events = []
+        i = self._pos
+        while i < len(text) and not self.done:
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    frame = self._stack[-1]
+                    if frame.kind == "object" and frame.expect_key:
+                        frame.key = json.loads(text[self._string_start:i + 1])
+            elif not self._stack:
+                if c == "{":
+                    self._stack.append(_Frame("object", (), True))
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            else:
+                frame = self._stack[-1]
+                if c == ":" and frame.kind == "object":
+                    frame.expect_key = False
+                    frame.value_start = i + 1
+                elif c in "{[":
+                    emit = frame.kind == "object" and frame.path == () and frame.key in self.expand and c == "{"
+                    path = frame.path + (frame.key,) if frame.kind == "object" else frame.path
+                    self._stack.append(_Frame("object" if c == "{" else "array", path, emit))
+                elif c in "}]":
+                    self._complete(frame, i, events)
+                    self._stack.pop()
+                    if not self._stack:
+                        self.done = True
+                elif c == "," and frame.kind == "object":
+                    self._complete(frame, i, events)
+                    frame.expect_key = True
+            i += 1
+        self._pos = i
+        return events
+
+    def _complete(self, frame, end, events):
+        if frame.kind == "object" and frame.emit and frame.key is not None and frame.value_start is not None:
+            raw = self._text[frame.value_start:end].strip()
+            if raw:
+                events.append((frame.path + (frame.key,), json.loads(raw)))
+        frame.key = None
+        frame.value_start = None
@@ -0,0 +1,127 @@
+import pytest
+
+import auth_cache
+from auth_cache import CERTS_MIN_REFETCH_SECONDS, FIREBASE_ISSUER_PREFIX, KeySource, StaticKeySource, TokenVerifier
+from benchmarks.token_verification import PROJECT_ID, make_signer, mint_token
+
+
+@pytest.fixture(scope="module")
+def signer_and_certs():
+    # RSA key generation is slow, so one key serves the whole module.
+    return make_signer()
+
+
+@pytest.fixture
+def verifier(signer_and_certs):
+    _, certs = signer_and_certs
+    return TokenVerifier(PROJECT_ID, StaticKeySource(certs))
+
+
+class RotatingKeySource(StaticKeySource):
+    """Serves stale certificates until refreshed, recording the min_interval of each refresh."""
+
+    def __init__(self, stale, fresh):
+        super().__init__(stale)
+        self.fresh = fresh
+        self.refreshes = []
+
+    def refresh(self, min_interval=0):
+        self.refreshes.append(min_interval)
+        self.certs = self.fresh
+        return self.certs
+
+
+class FixedKeySource(KeySource):
+    def __init__(self):
+        super().__init__(url="unused")
+        self.fetch_calls = 0
+
+    def fetch(self):
+        self.fetch_calls += 1
+        return {"kid": "cert"}, 3600
+
+
+def test_valid_token_is_verified_then_served_from_cache(signer_and_certs, verifier):
+    signer, _ = signer_and_certs
+    token = mint_token(signer, "user-1")
+    assert verifier.verify(token)["uid"] == "user-1"
+    assert verifier.verify(token)["uid"] == "user-1"
+    stats = verifier.stats()
+    assert (stats["misses"], stats["hits"], stats["verifyCount"]) == (1, 1, 1)
+
+
+@pytest.mark.parametrize("claims", [
+    {"aud": "some-other-project"},
+    {"iss": FIREBASE_ISSUER_PREFIX + "some-other-project"},
+    {"iss": "https://accounts.google.com"},
+    {"sub": ""},
+])
+def test_wrong_claims_are_rejected(signer_and_certs, verifier, claims):
+    signer, _ = signer_and_certs
+    with pytest.raises(ValueError):
+        verifier.verify(mint_token(signer, "user-1", **claims))
+    assert verifier.stats()["failures"] == 1
+    assert verifier.stats()["entries"] == 0
+
+
+def test_expired_token_is_rejected(signer_and_certs, verifier):
+    signer, _ = signer_and_certs
+    with pytest.raises(ValueError):
+        verifier.verify(mint_token(signer, "user-1", lifetime=-120))
+
+
+def test_token_signed_by_another_key_is_rejected(verifier):
+    # Same kid as the trusted certificate, different private key.
+    impostor, _ = make_signer()
+    with pytest.raises(ValueError):
+        verifier.verify(mint_token(impostor, "user-1"))
+
+
+def test_unknown_kid_refreshes_certificates_with_rate_limit(signer_and_certs):
+    _, stale = signer_and_certs
+    rotated_signer, fresh = make_signer(key_id="rotated-key")
+    key_source = RotatingKeySource(stale, fresh)
+    verifier = TokenVerifier(PROJECT_ID, key_source)
+    assert verifier.verify(mint_token(rotated_signer, "user-1"))["uid"] == "user-1"
+    assert key_source.refreshes == [CERTS_MIN_REFETCH_SECONDS]
+
+
+def test_refresh_within_min_interval_does_not_refetch():
+    key_source = FixedKeySource()
+    key_source.refresh()
+    key_source.refresh(min_interval=CERTS_MIN_REFETCH_SECONDS)
+    assert key_source.fetch_calls == 1
+    key_source.refresh()
+    assert key_source.fetch_calls == 2
+
+
+def test_cache_entry_expires_at_exp_minus_skew(signer_and_certs, monkeypatch):
+    signer, certs = signer_and_certs
+    verifier = TokenVerifier(PROJECT_ID, StaticKeySource(certs), skew=30)
+    token = mint_token(signer, "user-1", lifetime=100)
+    exp = verifier.verify(token)["exp"]
+
+    # Only the cache's clock moves; the token itself stays valid for the signature check.
+    monkeypatch.setattr(auth_cache.time, "time", lambda: exp - 31)
+    verifier.verify(token)
+    assert verifier.stats()["hits"] == 1
+    monkeypatch.setattr(auth_cache.time, "time", lambda: exp - 30)
+    verifier.verify(token)
+    stats = verifier.stats()
+    assert (stats["hits"], stats["misses"], stats["verifyCount"]) == (1, 2, 2)
+
+
+def test_least_recently_used_entry_is_evicted(signer_and_certs):
+    signer, certs = signer_and_certs
+    verifier = TokenVerifier(PROJECT_ID, StaticKeySource(certs), max_entries=2)
+    first, second, third = (mint_token(signer, f"user-{i}") for i in range(3))
+    verifier.verify(first)
+    verifier.verify(second)
+    verifier.verify(first)
+    verifier.verify(third)
+    assert verifier.stats()["evictions"] == 1
+    verifier.verify(first)
+    assert verifier.stats()["hits"] == 2
+    verifier.verify(second)
+    stats = verifier.stats()
+    assert (stats["misses"], stats["entries"]) == (4, 2)
@@ -0,0 +1,92 @@
+import json
+import asyncio
+
+import pytest
+
+import llm
+from benchmarks.fakes import SAMPLE_ANALYSIS, StubResponse
+from cache import ResultCache
+from schemas import GeneratedQuestions, ProjectQuestions, ResumeAnalysis
+
+ANALYSIS = json.dumps({key: SAMPLE_ANALYSIS[key] for key in ResumeAnalysis.model_fields}, indent=2)
+PROJECT = json.dumps({"projectQuestions": SAMPLE_ANALYSIS["projectQuestions"]}, indent=2)
+QUESTIONS = json.dumps({"categories": SAMPLE_ANALYSIS["categories"]}, indent=2)
+MISSING_FIELD = json.dumps({"projectQuestions": [{"question": "Why?", "difficulty": 3}]})
+QUESTION = SAMPLE_ANALYSIS["projectQuestions"][0]
+FIVE_QUESTIONS = json.dumps({"categories": [{"category": "Core Technical Skills", "questions": [QUESTION] * 5}]}, indent=2)
+# Cut after the comma that follows the fourth question, so closing the brackets would leave a valid reply with four.
+FOUR_AND_A_BIT = FIVE_QUESTIONS[:FIVE_QUESTIONS.rindex('{\n          "question"')]
+
+# (scripted replies, schema, expected outcome, Gemini calls)
+CASES = {
+    "clean analysis": ([ANALYSIS], ResumeAnalysis, "parsed", 1),
+    "fenced analysis": (["```json\n" + ANALYSIS + "\n```"], ResumeAnalysis, "parsed", 1),
+    "prose around object": (["Here are the questions:\n" + PROJECT + "\nGood luck!"], ProjectQuestions, "repaired", 1),
+    "trailing commas": ([QUESTIONS.replace("]\n", "],\n").replace("}\n", "},\n")], GeneratedQuestions, "repaired", 1),
+    "truncated last string": ([QUESTIONS[:QUESTIONS.rindex("tests practical")], QUESTIONS], GeneratedQuestions, "retried", 2),
+    "truncated inside analysis string": ([ANALYSIS[:ANALYSIS.index("For the HR partner") + 12], ANALYSIS], ResumeAnalysis, "retried", 2),
+    "truncated between list items": ([FOUR_AND_A_BIT, FIVE_QUESTIONS], GeneratedQuestions, "retried", 2),
+    "truncated analysis": ([ANALYSIS[:ANALYSIS.index("thin on")], ANALYSIS], ResumeAnalysis, "retried", 2),
+    "truncated mid-question": ([PROJECT[:PROJECT.index("expectedAnswer")], PROJECT], ProjectQuestions, "retried", 2),
+    "missing required field": ([MISSING_FIELD, PROJECT], ProjectQuestions, "retried", 2),
+    "wrong shape": ([ANALYSIS, QUESTIONS], GeneratedQuestions, "retried", 2),
+    "safety refusal twice": (["I can't help with that.", "I can't help with that."], ProjectQuestions, "failed", 2),
+}
+
+
+class ScriptedModel:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.calls += 1
+        return StubResponse(self.replies[min(self.calls, len(self.replies)) - 1])
+
+
+def outcome_of(before):
+    changed = [key for key in ("failed", "retried", "repaired", "parsed") if llm.response_stats[key] > before[key]]
+    return changed[0]
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_recorded_replies(name):
+    replies, schema, expected, calls = CASES[name]
+    model = ScriptedModel(replies)
+    before = dict(llm.response_stats)
+    try:
+        parsed, _ = asyncio.run(llm.generate_parsed(model, "prompt", schema, retries=1))
+    except ValueError:
+        parsed = None
+    assert (outcome_of(before), model.calls) == (expected, calls)
+    if parsed is not None:
+        # Whatever is returned is the complete reply, never a shortened one.
+        assert parsed == schema.model_validate(llm.repair_json(replies[-1])).model_dump()
+
+
+@pytest.mark.parametrize("text", [
+    QUESTIONS[:QUESTIONS.rindex("tests practical")],
+    FOUR_AND_A_BIT,
+    '{"a": "unterminated \\',
+    '{"a": [1, 2',
+])
+def test_repair_json_rejects_truncated_output(text):
+    with pytest.raises(ValueError):
+        llm.repair_json(text)
+
+
+def test_repair_json_keeps_brackets_and_commas_inside_strings():
+    assert llm.repair_json('Sure! {"a": "x, }", "b": [1, 2,],} Thanks') == {"a": "x, }", "b": [1, 2]}
+
+
+@pytest.mark.parametrize("reply, cached", [(QUESTIONS, True), ("Here you go: " + QUESTIONS, False)])
+def test_only_clean_replies_are_cached(reply, cached):
+    cache = ResultCache()
+
+    async def run():
+        result = await llm.generate_json(ScriptedModel([reply]), "prompt", cache_key="key", cache=cache, schema=GeneratedQuestions)
+        return result, await cache.get("key")
+
+    result, stored = asyncio.run(run())
+    assert result["categories"][0]["category"] == "Core Technical Skills"
+    assert (stored == result) if cached else stored is None
@@ -0,0 +1,38 @@
+import asyncio
+
+import httpx
+import pytest
+
+import llm
+from benchmarks.fakes import StubModel, load_app, make_pdf
+from benchmarks.load_test import RESUME_PAGES
+
+
+@pytest.fixture(scope="module")
+def main():
+    return load_app(StubModel(latency=1.0))
+
+
+def test_requests_over_the_queue_get_429_with_retry_after(main, monkeypatch):
+    # Two calls run and one waits; the other three are turned away without reaching Gemini.
+    monkeypatch.setattr(llm, "llm_gate", llm.LLMGate(max_concurrency=2, max_queue=1, retry_after=7))
+    pdf = make_pdf(RESUME_PAGES)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            # The PDF cache is warmed first so every request reaches the gate together.
+            await main.pdf_ingestor.ingest_bytes(pdf)
+            return await asyncio.gather(*(
+                client.post(
+                    "/analyze-resume/",
+                    files={"file": ("resume.pdf", pdf, "application/pdf")},
+                    data={"job_description": f"Queue test #{i}", "difficulty": "3"},
+                )
+                for i in range(6)
+            ))
+
+    responses = asyncio.run(run())
+    assert sorted(response.status_code for response in responses) == [200, 200, 200, 429, 429, 429]
+    for response in responses:
+        if response.status_code == 429:
+            assert response.headers["retry-after"] == "7"
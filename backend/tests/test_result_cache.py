@@ -0,0 +1,28 @@
+import asyncio
+
+from cache import ResultCache
+
+
+def test_disk_tier_purges_expired_rows_and_caps_row_count(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "results.db")
+    cache = ResultCache(ttl=100, db_path=db_path)
+    cache.disk.max_entries = 3
+    clock = [1000.0]
+    monkeypatch.setattr("cache.time.time", lambda: clock[0])
+
+    async def fill():
+        for i in range(5):
+            clock[0] += 1
+            await cache.set(f"key-{i}", {"i": i})
+
+    asyncio.run(fill())
+    rows = [key for key, in cache.disk._conn.execute("SELECT key FROM results ORDER BY key")]
+    assert rows == ["key-2", "key-3", "key-4"]
+    assert cache.stats()["diskEvictions"] == 2
+
+    # Once key-2 and key-3 are past their TTL, the next write purges them.
+    clock[0] = 1104.5
+    asyncio.run(cache.set("key-5", {"i": 5}))
+    rows = [key for key, in cache.disk._conn.execute("SELECT key FROM results ORDER BY key")]
+    assert rows == ["key-4", "key-5"]
+    assert asyncio.run(ResultCache(db_path=db_path).get("key-4")) == {"i": 4}
@@ -30,6 +30,20 @@ const renderWithHighlights = (text, keywords) => {
     );
 };
 
+// Follow-up calls send the server-side resume_id; if that session has expired, resend the full text.
+const postResumeRequest = async (path, payload, result, config) => {
+    try {
+        return await axios.post(`${API_URL}${path}`, { ...payload, resume_id: result.resumeId }, config);
+    } catch (err) {
+        if (err.response?.status !== 404) throw err;
+        return axios.post(`${API_URL}${path}`, {
+            ...payload,
+            resume_text: result.rawResumeText,
+            job_description: result.jobDescription
+        }, config);
+    }
+};
+
 function App() {
     const [currentUser, setCurrentUser] = useState(null);
     const [authLoading, setAuthLoading] = useState(true);
@@ -66,11 +80,9 @@ function App() {
         debounceTimeout.current = setTimeout(async () => {
             try {
                 const config = await getAuthHeaders();
-                const response = await axios.post(`${API_URL}/regenerate-questions/`, {
-                    resume_text: analysisResult.rawResumeText,
-                    job_description: analysisResult.jobDescription,
+                const response = await postResumeRequest('/regenerate-questions/', {
                     difficulty: difficulty
-                }, config);
+                }, analysisResult, config);
                 setAnalysisResult(prevResult => ({
                     ...prevResult,
                     categorizedQuestions: response.data.categorizedQuestions
@@ -133,10 +145,9 @@ function App() {
         setProjectQuestions(null);
         try {
             const config = await getAuthHeaders();
-            const response = await axios.post(`${API_URL}/project-questions/`, {
-                resume_text: analysisResult.rawResumeText,
+            const response = await postResumeRequest('/project-questions/', {
                 project_name: projectName
-            }, config);
+            }, analysisResult, config);
             setProjectQuestions(response.data.projectQuestions);
         } catch (err) {
             setProjectError(`Failed to get project questions: ${err.response?.data?.detail || err.message}`);